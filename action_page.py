@@ -1,21 +1,78 @@
 import os
 import json
-from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton,
-                             QScrollArea, QGridLayout, QMessageBox, QFrame)
+import math
+from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton, QScrollArea, QGridLayout,
+                             QMessageBox, QFrame, QProgressDialog, QDialog, QListWidget, QListWidgetItem, QSpinBox)
 from PyQt5.QtGui import QPixmap
 from PyQt5.QtCore import Qt, pyqtSignal
 from image_viewer import ImageViewer
+from image_cache import image_cache
+from metrics import metrics
+from mosaic_stitcher import MosaicWorker, list_source_images, next_mosaic_path
+from project_watcher import get_project_watcher, IMAGE_EXTENSIONS
+
+class StitchDialog(QDialog):
+    def __init__(self, image_paths, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Stitch Mosaic")
+        self.image_paths = image_paths
+        self.setup_ui()
+
+    def setup_ui(self):
+        layout = QVBoxLayout()
+
+        layout.addWidget(QLabel("Captures to stitch:"))
+        self.image_list = QListWidget()
+        for image_path in self.image_paths:
+            item = QListWidgetItem(os.path.basename(image_path))
+            item.setFlags(item.flags() | Qt.ItemIsUserCheckable)
+            item.setCheckState(Qt.Checked)
+            self.image_list.addItem(item)
+        layout.addWidget(self.image_list)
+
+        # Only captures up to one scan row apart are matched, so matching grows linearly with the image count
+        row_layout = QHBoxLayout()
+        row_layout.addWidget(QLabel("Images per scan row:"))
+        self.row_length_input = QSpinBox()
+        self.row_length_input.setRange(1, len(self.image_paths))
+        self.row_length_input.setValue(math.ceil(math.sqrt(len(self.image_paths))))
+        row_layout.addWidget(self.row_length_input)
+        layout.addLayout(row_layout)
+
+        buttons = QHBoxLayout()
+        stitch_button = QPushButton("Stitch")
+        stitch_button.clicked.connect(self.accept)
+        cancel_button = QPushButton("Cancel")
+        cancel_button.clicked.connect(self.reject)
+        buttons.addWidget(stitch_button)
+        buttons.addWidget(cancel_button)
+
+        layout.addLayout(buttons)
+        self.setLayout(layout)
+
+    def selected_paths(self):
+        return [path for i, path in enumerate(self.image_paths)
+                if self.image_list.item(i).checkState() == Qt.Checked]
+
+    def max_pair_distance(self):
+        # One row further on, plus one for the diagonal neighbour
+        return self.row_length_input.value() + 1
 
 class ActionPage(QWidget):
     go_back_signal = pyqtSignal()
 
-    def __init__(self, project_name, projects_folder):
+    def __init__(self, project_name, projects_folder, filenames=None):
         super().__init__()
         self.project_name = project_name
         self.projects_folder = projects_folder
         self.project_folder = os.path.join(projects_folder, project_name)
+        # When set, the grid only shows these images (e.g. search results)
+        self.filenames = list(filenames) if filenames is not None else None
         self.selected_image = None
         self.image_containers = {}
+        self.image_viewer = None
+        self.watcher = get_project_watcher(projects_folder)
+        self.watcher.project_changed.connect(self.on_project_changed)
         self.setup_ui()
 
     def setup_ui(self):
@@ -33,6 +90,8 @@ class ActionPage(QWidget):
             info_layout.addWidget(QLabel(f"Description: {self.project_info.get('description', 'N/A')}"))
         else:
             info_layout.addWidget(QLabel("Project information not available"))
+        if self.filenames is not None:
+            info_layout.addWidget(QLabel(f"Showing {len(self.filenames)} search results"))
         
         layout.addLayout(info_layout)
 
@@ -57,49 +116,92 @@ class ActionPage(QWidget):
         zoom_button.clicked.connect(self.zoom_image)
         button_layout.addWidget(zoom_button)
 
+        stitch_button = QPushButton("Stitch Mosaic")
+        stitch_button.clicked.connect(self.stitch_mosaic)
+        button_layout.addWidget(stitch_button)
+
         layout.addLayout(button_layout)
 
         self.setLayout(layout)
         self.load_images()
 
+    def list_images(self):
+        if self.filenames is not None:
+            return [f for f in self.filenames if f.lower().endswith(IMAGE_EXTENSIONS)]
+        return self.watcher.images(self.project_name)
+
     def load_images(self):
-        row = 0
-        col = 0
-        for filename in os.listdir(self.project_folder):
-            if filename.lower().endswith(('.png', '.jpg', '.jpeg', '.bmp', '.gif')):
-                image_path = os.path.join(self.project_folder, filename)
-                pixmap = QPixmap(image_path)
-                
-                thumbnail = pixmap.scaled(150, 150, Qt.KeepAspectRatio, Qt.SmoothTransformation)
-                
-                container = QFrame()
-                container.setFrameShape(QFrame.Box)
-                container.setLineWidth(2)
-                container.setStyleSheet("QFrame { border: 2px solid transparent; }")
-                container_layout = QVBoxLayout(container)
-                container_layout.setSpacing(2)
-                container_layout.setContentsMargins(0, 0, 0, 0)
-                
-                thumbnail_label = QLabel()
-                thumbnail_label.setPixmap(thumbnail)
-                thumbnail_label.setAlignment(Qt.AlignCenter)
-                thumbnail_label.setFixedSize(150, 150)
-                thumbnail_label.mousePressEvent = lambda event, f=filename: self.select_image(f)
-                container_layout.addWidget(thumbnail_label)
-                
-                filename_label = QLabel(filename)
-                filename_label.setAlignment(Qt.AlignCenter)
-                filename_label.setWordWrap(True)
-                filename_label.setStyleSheet("font-size: 8px;")
-                container_layout.addWidget(filename_label)
-                
-                self.grid_layout.addWidget(container, row, col)
-                self.image_containers[filename] = container
-                
-                col += 1
-                if col > 3:
-                    col = 0
-                    row += 1
+        for filename in self.list_images():
+            self.image_containers[filename] = self.create_thumbnail(filename)
+        self.relayout_grid()
+
+    def create_thumbnail(self, filename):
+        image_path = os.path.join(self.project_folder, filename)
+        with metrics.timer('thumbnail.load'):
+            image = image_cache.get_thumbnail(image_path, 150)
+        # Unreadable or vanished files keep their tile; the watcher removes them once they are gone
+        thumbnail = QPixmap.fromImage(image) if image is not None else QPixmap()
+        
+        container = QFrame()
+        container.setFrameShape(QFrame.Box)
+        container.setLineWidth(2)
+        container.setStyleSheet("QFrame { border: 2px solid transparent; }")
+        container_layout = QVBoxLayout(container)
+        container_layout.setSpacing(2)
+        container_layout.setContentsMargins(0, 0, 0, 0)
+        
+        thumbnail_label = QLabel()
+        thumbnail_label.setPixmap(thumbnail)
+        thumbnail_label.setAlignment(Qt.AlignCenter)
+        thumbnail_label.setFixedSize(150, 150)
+        thumbnail_label.mousePressEvent = lambda event, f=filename: self.select_image(f)
+        container_layout.addWidget(thumbnail_label)
+        
+        filename_label = QLabel(filename)
+        filename_label.setAlignment(Qt.AlignCenter)
+        filename_label.setWordWrap(True)
+        filename_label.setStyleSheet("font-size: 8px;")
+        container_layout.addWidget(filename_label)
+        return container
+
+    def relayout_grid(self):
+        for i, container in enumerate(self.image_containers.values()):
+            self.grid_layout.removeWidget(container)
+            self.grid_layout.addWidget(container, i // 4, i % 4)
+
+    def remove_thumbnail(self, filename):
+        container = self.image_containers.pop(filename, None)
+        if container:
+            container.setParent(None)
+        if self.selected_image == filename:
+            self.selected_image = None
+
+    def on_project_changed(self, project_name, added, removed, modified):
+        if project_name != self.project_name:
+            return
+        for filename in removed + modified:
+            image_cache.invalidate(os.path.join(self.project_folder, filename))
+        for filename in removed:
+            self.remove_thumbnail(filename)
+            if self.filenames is not None and filename in self.filenames:
+                self.filenames.remove(filename)
+        for filename in modified:
+            if filename in self.image_containers:
+                self.image_containers[filename].setParent(None)
+                self.image_containers[filename] = self.create_thumbnail(filename)
+                if filename == self.selected_image:
+                    self.image_containers[filename].setStyleSheet("QFrame { border: 2px solid blue; }")
+        # A filtered grid only shows its search results, so new files are left out
+        if self.filenames is None:
+            for filename in added:
+                # Files can vanish again before the debounced event arrives
+                if filename.lower().endswith(IMAGE_EXTENSIONS) and \
+                        os.path.exists(os.path.join(self.project_folder, filename)):
+                    self.image_containers[filename] = self.create_thumbnail(filename)
+        self.relayout_grid()
+        self.update_viewer_paths()
+        if self.project_info:
+            self.total_data_label.setText(f"Total Data: {self.watcher.file_count(self.project_name)}")
 
     def load_project_info(self):
         projects_file = os.path.join(os.path.dirname(self.projects_folder), 'projects.json')
@@ -107,7 +209,7 @@ class ActionPage(QWidget):
             print(f"File not found: {projects_file}")
             return {}
         
-        with open(projects_file, 'r') as f:
+        with metrics.timer('catalogue.load'), open(projects_file, 'r') as f:
             projects = json.load(f)
         for project in projects:
             if project['name'] == self.project_name:
@@ -119,6 +221,7 @@ class ActionPage(QWidget):
             self.image_containers[self.selected_image].setStyleSheet("QFrame { border: 2px solid transparent; }")
         self.selected_image = filename
         self.image_containers[filename].setStyleSheet("QFrame { border: 2px solid blue; }")
+        image_cache.prefetch([os.path.join(self.project_folder, filename)])
         print(f"Selected image: {filename}")
 
     def delete_image(self):
@@ -127,35 +230,100 @@ class ActionPage(QWidget):
                                          f"Are you sure you want to delete '{self.selected_image}'?",
                                          QMessageBox.Yes | QMessageBox.No, QMessageBox.No)
             if reply == QMessageBox.Yes:
-                image_path = os.path.join(self.project_folder, self.selected_image)
+                filename = self.selected_image
+                image_path = os.path.join(self.project_folder, filename)
                 os.remove(image_path)
+                # The watcher announces the removal, which drops the thumbnail and cached image
+                self.watcher.forget_file(self.project_name, filename)
                 self.update_project_data()
-                self.reload_images()
         else:
             QMessageBox.warning(self, "No Image Selected", "Please select an image to delete.")
 
     def zoom_image(self):
         if self.selected_image:
-            image_path = os.path.join(self.project_folder, self.selected_image)
-            self.image_viewer = ImageViewer(image_path)
-            self.image_viewer.setWindowTitle(self.selected_image)
-            self.image_viewer.resize(800, 600)
-            self.image_viewer.show()
+            self.show_in_viewer(os.path.join(self.project_folder, self.selected_image))
         else:
             QMessageBox.warning(self, "No Image Selected", "Please select an image to view.")
 
+    def viewer_paths(self):
+        return [os.path.join(self.project_folder, f) for f in self.image_containers]
+
+    def update_viewer_paths(self):
+        # Keep an open viewer's Previous/Next in step with the grid
+        if self.image_viewer is not None:
+            self.image_viewer.update_image_list(self.viewer_paths())
+
+    def show_in_viewer(self, image_path):
+        image_paths = self.viewer_paths()
+        if image_path not in image_paths:
+            image_paths.append(image_path)
+        # Reuse one viewer so flipping between images does not pile up decoded copies
+        if self.image_viewer is None:
+            self.image_viewer = ImageViewer(image_path, image_paths)
+            self.image_viewer.setWindowTitle(os.path.basename(image_path))
+            self.image_viewer.resize(800, 600)
+        else:
+            self.image_viewer.set_image_list(image_paths, image_path)
+        self.image_viewer.show()
+        self.image_viewer.raise_()
+
+    def stitch_mosaic(self):
+        image_paths = list_source_images(self.project_folder)
+        if len(image_paths) < 2:
+            QMessageBox.warning(self, "Not Enough Images", "At least two images are needed to stitch a mosaic.")
+            return
+        dialog = StitchDialog(image_paths, self)
+        if dialog.exec_() != QDialog.Accepted:
+            return
+        image_paths = dialog.selected_paths()
+        if len(image_paths) < 2:
+            QMessageBox.warning(self, "Not Enough Images", "Select at least two images to stitch a mosaic.")
+            return
+
+        self.mosaic_progress = QProgressDialog("Stitching mosaic...", None, 0, 100, self)
+        self.mosaic_progress.setWindowTitle("Stitch Mosaic")
+        self.mosaic_progress.setWindowModality(Qt.WindowModal)
+        self.mosaic_progress.setMinimumDuration(0)
+        self.mosaic_progress.show()
+
+        output_path = next_mosaic_path(self.project_folder, self.watcher.file_count(self.project_name))
+        self.mosaic_worker = MosaicWorker(image_paths, output_path, dialog.max_pair_distance(), self)
+        self.mosaic_worker.progress.connect(self.update_mosaic_progress)
+        self.mosaic_worker.stitched.connect(self.mosaic_finished)
+        self.mosaic_worker.failed.connect(self.mosaic_failed)
+        self.mosaic_worker.start()
+
+    def update_mosaic_progress(self, stage, done, total):
+        self.mosaic_progress.setLabelText(f"{stage} ({done}/{total})")
+        self.mosaic_progress.setValue(int(100 * done / total) if total else 0)
+
+    def mosaic_finished(self, mosaic_path, notes):
+        self.mosaic_progress.close()
+        # The watcher announces the new file, which adds its thumbnail
+        self.watcher.note_file(self.project_name, os.path.basename(mosaic_path))
+        self.update_project_data()
+        if image_cache.get(mosaic_path) is not None:
+            self.show_in_viewer(mosaic_path)
+        else:
+            notes.append("The mosaic was saved but could not be opened in the viewer.")
+        if notes:
+            QMessageBox.information(self, "Mosaic Created", "\n".join(notes))
+
+    def mosaic_failed(self, message):
+        self.mosaic_progress.close()
+        QMessageBox.warning(self, "Stitching Failed", message)
+
     def update_project_data(self):
         projects_file = os.path.join(os.path.dirname(self.projects_folder), 'projects.json')
-        with open(projects_file, 'r') as f:
+        with metrics.timer('catalogue.load'), open(projects_file, 'r') as f:
             projects = json.load(f)
         for project in projects:
             if project['name'] == self.project_name:
-                project['total_data'] = len([name for name in os.listdir(self.project_folder)
-                                             if os.path.isfile(os.path.join(self.project_folder, name))])
+                project['total_data'] = self.watcher.file_count(self.project_name)
                 self.project_info = project
                 self.total_data_label.setText(f"Total Data: {project['total_data']}")
                 break
-        with open(projects_file, 'w') as f:
+        with metrics.timer('catalogue.save'), open(projects_file, 'w') as f:
             json.dump(projects, f)
 
     def reload_images(self):
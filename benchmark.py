@@ -0,0 +1,257 @@
+import os
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+import argparse
+import json
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+import cv2
+import numpy as np
+from PyQt5.QtWidgets import QApplication, QMessageBox, QStackedWidget
+from PyQt5.QtCore import QT_VERSION_STR
+
+
+class FakeVideoCapture:
+    def __init__(self, source=None, frames=None, fps=30):
+        if frames is None:
+            if isinstance(source, str) and os.path.isdir(source):
+                paths = sorted(os.path.join(source, f) for f in os.listdir(source)
+                               if f.lower().endswith(('.png', '.jpg', '.jpeg', '.bmp')))
+                frames = [cv2.imread(p) for p in paths]
+            elif isinstance(source, str):
+                frames = [cv2.imread(source)]
+            else:
+                frames = [synthetic_frame(1280, 720, seed=0)]
+        self.frames = frames
+        self.index = 0
+        self.opened = bool(frames)
+        self.properties = {
+            cv2.CAP_PROP_FRAME_WIDTH: frames[0].shape[1] if frames else 0,
+            cv2.CAP_PROP_FRAME_HEIGHT: frames[0].shape[0] if frames else 0,
+            cv2.CAP_PROP_FPS: fps,
+        }
+
+    def isOpened(self):
+        return self.opened
+
+    def read(self):
+        if not self.opened:
+            return False, None
+        frame = self.frames[self.index % len(self.frames)]
+        self.index += 1
+        return True, frame.copy()
+
+    def grab(self):
+        return self.opened
+
+    def set(self, prop, value):
+        self.properties[prop] = value
+        return True
+
+    def get(self, prop):
+        return self.properties.get(prop, 0)
+
+    def release(self):
+        self.opened = False
+
+
+def synthetic_frame(width, height, seed):
+    # Smooth stain-like blobs over a light background compress like real slide captures
+    rng = np.random.default_rng(seed)
+    small = rng.integers(0, 256, (max(height // 32, 1), max(width // 32, 1), 3), dtype=np.uint8)
+    frame = cv2.resize(small, (width, height), interpolation=cv2.INTER_CUBIC)
+    noise = rng.normal(0, 6, frame.shape).astype(np.int16)
+    return np.clip(frame.astype(np.int16) // 2 + 110 + noise, 0, 255).astype(np.uint8)
+
+
+def create_synthetic_workspace(root, image_count, project_count, width, height, seed):
+    projects_folder = os.path.join(root, 'projects')
+    os.makedirs(projects_folder)
+
+    # Encoding is the slow part, so a handful of distinct JPEGs are reused across files
+    encoded = []
+    for i in range(min(8, image_count)):
+        ok, buffer = cv2.imencode('.jpg', synthetic_frame(width, height, seed + i))
+        encoded.append(buffer.tobytes())
+
+    projects = []
+    for p in range(project_count):
+        projects.append({
+            "name": f"bench-{p:03d}",
+            "timestamp_create": "01-01-2024 00:00:00",
+            "total_data": 0,
+            "sync_status": "Not Synced",
+            "description": "Synthetic benchmark project"
+        })
+        os.makedirs(os.path.join(projects_folder, projects[-1]['name']))
+
+    # The first project holds all images so the grid benchmark sees the full count
+    project_folder = os.path.join(projects_folder, projects[0]['name'])
+    for i in range(image_count):
+        filename = f"20240101-{i // 3600 % 24:02d}{i // 60 % 60:02d}{i % 60:02d}-{i + 1:05d}.jpg"
+        with open(os.path.join(project_folder, filename), 'wb') as f:
+            f.write(encoded[i % len(encoded)])
+    projects[0]['total_data'] = image_count
+
+    with open(os.path.join(root, 'projects.json'), 'w') as f:
+        json.dump(projects, f)
+    return projects[0]['name'], os.path.join(project_folder, filename)
+
+
+def summarize(samples):
+    samples_ms = sorted(s * 1000 for s in samples)
+    return {
+        "runs": len(samples_ms),
+        "mean_ms": statistics.fmean(samples_ms),
+        "median_ms": statistics.median(samples_ms),
+        "p95_ms": samples_ms[min(len(samples_ms) - 1, int(len(samples_ms) * 0.95))],
+        "min_ms": samples_ms[0],
+        "max_ms": samples_ms[-1],
+    }
+
+
+def time_calls(func, repeat, setup=None):
+    samples = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def bench_load_images(project_name, repeat):
+    from action_page import ActionPage
+    from image_cache import image_cache
+    page = ActionPage(project_name, 'projects')
+    # Cold runs start from an empty cache so thumbnail decoding is measured, not just widget creation
+    result = summarize(time_calls(page.reload_images, repeat, setup=image_cache.clear))
+    result["warm"] = summarize(time_calls(page.reload_images, repeat))
+    return result
+
+
+def bench_update_project_display(repeat):
+    from project_page import ProjectPage
+    page = ProjectPage(QStackedWidget())
+    return summarize(time_calls(page.update_project_display, repeat))
+
+
+def bench_capture(project_name, count):
+    from capture_page import CapturePage
+    page = CapturePage()
+    page.open_camera(0)
+    page.project_dropdown.setCurrentIndex(page.project_dropdown.findText(project_name))
+
+    start = time.perf_counter()
+    samples = time_calls(page.capture_image, count)
+    elapsed = time.perf_counter() - start
+    result = summarize(samples)
+    result["throughput_per_s"] = count / elapsed
+    page.camera.release()
+    return result
+
+
+def bench_preview(frame_count):
+    from capture_page import CapturePage
+    page = CapturePage()
+    page.open_camera(0)
+    page.resize(1024, 768)
+
+    start = time.perf_counter()
+    samples = time_calls(page.update_frame, frame_count)
+    elapsed = time.perf_counter() - start
+    result = summarize(samples)
+    result["fps"] = frame_count / elapsed
+    page.camera.release()
+    return result
+
+
+def bench_zoom(image_path, repeat):
+    from image_viewer import ImageViewer
+    viewer = ImageViewer(image_path)
+    zoom_in = time_calls(viewer.zoom_in, repeat)
+    zoom_out = time_calls(viewer.zoom_out, repeat)
+    return {"zoom_in": summarize(zoom_in), "zoom_out": summarize(zoom_out)}
+
+
+def run(args):
+    app = QApplication.instance() or QApplication(sys.argv)
+    # Message boxes are modal and would block a headless run
+    QMessageBox.information = staticmethod(lambda *a, **k: QMessageBox.Ok)
+    QMessageBox.warning = staticmethod(lambda *a, **k: QMessageBox.Ok)
+
+    if args.source:
+        frames = FakeVideoCapture(args.source).frames
+    else:
+        frames = [synthetic_frame(args.width, args.height, args.seed + i) for i in range(4)]
+    real_video_capture = cv2.VideoCapture
+    cv2.VideoCapture = lambda *a, **k: FakeVideoCapture(frames=frames)
+
+    root = tempfile.mkdtemp(prefix='microscope-bench-')
+    cwd = os.getcwd()
+    results = {}
+    try:
+        os.chdir(root)
+        start = time.perf_counter()
+        project_name, sample_image = create_synthetic_workspace(
+            root, args.images, args.projects, args.width, args.height, args.seed)
+        results["generate_workspace_s"] = time.perf_counter() - start
+
+        results["action_page.load_images"] = bench_load_images(project_name, args.repeat)
+        results["project_page.update_project_display"] = bench_update_project_display(args.repeat)
+        results["capture_page.capture_image"] = bench_capture(project_name, args.captures)
+        results["capture_page.update_frame"] = bench_preview(args.frames)
+        results["image_viewer.zoom"] = bench_zoom(sample_image, args.repeat)
+        app.processEvents()
+    finally:
+        cv2.VideoCapture = real_video_capture
+        os.chdir(cwd)
+        if not args.keep:
+            shutil.rmtree(root, ignore_errors=True)
+
+    return {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec='seconds'),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "qt": QT_VERSION_STR,
+            "opencv": cv2.__version__,
+            "workspace": root if args.keep else None,
+            "parameters": vars(args),
+        },
+        "results": results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the microscope app hot paths headlessly.")
+    parser.add_argument('--images', type=int, default=1000, help="images in the synthetic project (1k-50k)")
+    parser.add_argument('--source', help="image file or folder of images to replay as the fake camera")
+    parser.add_argument('--projects', type=int, default=50, help="projects in the synthetic catalogue")
+    parser.add_argument('--width', type=int, default=2592)
+    parser.add_argument('--height', type=int, default=1944)
+    parser.add_argument('--repeat', type=int, default=5, help="repetitions for page and zoom timings")
+    parser.add_argument('--captures', type=int, default=20, help="images captured for latency/throughput")
+    parser.add_argument('--frames', type=int, default=200, help="preview frames rendered for fps")
+    parser.add_argument('--seed', type=int, default=1234)
+    parser.add_argument('--output', help="write JSON results to this file instead of stdout")
+    parser.add_argument('--keep', action='store_true', help="keep the synthetic workspace on disk")
+    args = parser.parse_args()
+
+    report = run(args)
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output)
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+import json
+import os
+import cv2
+
+PROFILES_FILE = 'camera_profiles.json'
+FOURCC_OPTIONS = ['Default', 'MJPG', 'YUYV', 'H264', 'NV12', 'GREY']
+# Asking for more than any sensor offers makes the driver fall back to its largest mode
+MAX_RESOLUTION = 10000
+
+DEFAULT_PROFILE = {
+    "preview": {"fourcc": "MJPG", "width": 1280, "height": 720, "fps": 30},
+    "still": {"fourcc": "MJPG", "width": 0, "height": 0, "fps": 0},
+    "warmup_frames": 2,
+}
+
+
+V4L2_CLASS = '/sys/class/video4linux'
+
+
+def read_sysfs(path):
+    try:
+        with open(path, 'r') as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+
+def device_identity(index):
+    # The video node's device link points at the USB interface; its parent is the USB device,
+    # whose directory name is the physical bus port (e.g. 1-2.3) and which may carry a serial
+    node = f"{V4L2_CLASS}/video{index}"
+    name = read_sysfs(f"{node}/name")
+    if name is None:
+        return None, None, None
+    usb_device = os.path.dirname(os.path.realpath(f"{node}/device"))
+    return name, read_sysfs(f"{usb_device}/serial"), os.path.basename(usb_device)
+
+
+def device_key(index):
+    # cv2 indices change whenever cameras are re-plugged, so profiles are keyed by the V4L2 name,
+    # plus the serial number when the camera reports one
+    name, serial, port = device_identity(index)
+    if name is None:
+        return f"Camera {index}"
+    if serial:
+        return f"{name} [{serial}]"
+    # Identical cameras without serials are told apart by the bus port they are plugged into;
+    # one camera exposes several nodes with the same name, so only other ports count
+    for entry in os.listdir(V4L2_CLASS):
+        if entry.startswith('video') and entry[5:].isdigit() and int(entry[5:]) != index:
+            other_name, _, other_port = device_identity(int(entry[5:]))
+            if other_name == name and other_port != port:
+                return f"{name} @ {port}"
+    return name
+
+
+def load_profiles(profiles_file=PROFILES_FILE):
+    if not os.path.exists(profiles_file):
+        return {}
+    with open(profiles_file, 'r') as f:
+        return json.load(f)
+
+
+def save_profiles(profiles, profiles_file=PROFILES_FILE):
+    with open(profiles_file, 'w') as f:
+        json.dump(profiles, f, indent=2)
+
+
+def get_profile(profiles, key):
+    stored = profiles.get(key, {})
+    return {
+        "preview": {**DEFAULT_PROFILE["preview"], **stored.get("preview", {})},
+        "still": {**DEFAULT_PROFILE["still"], **stored.get("still", {})},
+        "warmup_frames": stored.get("warmup_frames", DEFAULT_PROFILE["warmup_frames"]),
+    }
+
+
+def fourcc_to_str(value):
+    value = int(value)
+    if value <= 0:
+        return 'Default'
+    return ''.join(chr((value >> (8 * i)) & 0xFF) for i in range(4)).strip('\x00')
+
+
+def apply_mode(camera, mode):
+    # V4L2 applies format before size and size before rate, so the order here matters
+    if mode["fourcc"] != 'Default':
+        camera.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*mode["fourcc"]))
+    width = mode["width"] or MAX_RESOLUTION
+    height = mode["height"] or MAX_RESOLUTION
+    camera.set(cv2.CAP_PROP_FRAME_WIDTH, width)
+    camera.set(cv2.CAP_PROP_FRAME_HEIGHT, height)
+    if mode["fps"]:
+        camera.set(cv2.CAP_PROP_FPS, mode["fps"])
+    return read_mode(camera)
+
+
+def read_mode(camera):
+    return {
+        "fourcc": fourcc_to_str(camera.get(cv2.CAP_PROP_FOURCC)),
+        "width": int(camera.get(cv2.CAP_PROP_FRAME_WIDTH)),
+        "height": int(camera.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+        "fps": round(camera.get(cv2.CAP_PROP_FPS), 1),
+    }
+
+
+def mode_mismatches(requested, accepted):
+    mismatches = []
+    if requested["fourcc"] != 'Default' and requested["fourcc"] != accepted["fourcc"]:
+        mismatches.append(f"format {accepted['fourcc']} instead of {requested['fourcc']}")
+    if requested["width"] and (requested["width"], requested["height"]) != (accepted["width"], accepted["height"]):
+        mismatches.append(f"{accepted['width']}x{accepted['height']} instead of "
+                          f"{requested['width']}x{requested['height']}")
+    if requested["fps"] and accepted["fps"] and abs(requested["fps"] - accepted["fps"]) > 0.5:
+        mismatches.append(f"{accepted['fps']} fps instead of {requested['fps']}")
+    return mismatches
+
+
+def describe_mode(mode):
+    size = f"{mode['width']}x{mode['height']}" if mode['width'] else "max"
+    fps = f"{mode['fps']} fps" if mode['fps'] else "default fps"
+    return f"{mode['fourcc']} {size} @ {fps}"
+
+
+def needs_mode_switch(profile):
+    return profile["preview"] != profile["still"]
@@ -1,11 +1,95 @@
 import cv2
 import os
 import json
+import time
 from datetime import datetime
 from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton, 
-                             QComboBox, QMessageBox)
+                             QComboBox, QMessageBox, QCheckBox, QDialog, QSpinBox, QProgressDialog)
 from PyQt5.QtGui import QImage, QPixmap
 from PyQt5.QtCore import QTimer, Qt, pyqtSignal
+from metrics import metrics, RateMeter
+from frame_stacking import STACK_METHODS, StackingWorker
+from project_watcher import get_project_watcher
+from camera_profiles import (FOURCC_OPTIONS, MAX_RESOLUTION, device_key, load_profiles, save_profiles,
+                             get_profile, apply_mode, mode_mismatches, describe_mode, needs_mode_switch)
+
+PREVIEW_INTERVAL_MS = 30
+
+class CameraProfileDialog(QDialog):
+    def __init__(self, device_name, profile, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle(f"Capture Profile - {device_name}")
+        self.profile = profile
+        self.setup_ui()
+
+    def setup_ui(self):
+        layout = QVBoxLayout()
+        self.mode_inputs = {}
+
+        for mode_name, title in (("preview", "Preview Stream:"), ("still", "Still Capture:")):
+            mode = self.profile[mode_name]
+            layout.addWidget(QLabel(title))
+            row = QHBoxLayout()
+
+            fourcc_input = QComboBox()
+            fourcc_input.addItems(FOURCC_OPTIONS)
+            fourcc_input.setCurrentText(mode["fourcc"])
+            row.addWidget(QLabel("Format:"))
+            row.addWidget(fourcc_input)
+
+            width_input = QSpinBox()
+            width_input.setRange(0, MAX_RESOLUTION)
+            width_input.setSpecialValueText("Max")
+            width_input.setValue(mode["width"])
+            row.addWidget(QLabel("Width:"))
+            row.addWidget(width_input)
+
+            height_input = QSpinBox()
+            height_input.setRange(0, MAX_RESOLUTION)
+            height_input.setSpecialValueText("Max")
+            height_input.setValue(mode["height"])
+            row.addWidget(QLabel("Height:"))
+            row.addWidget(height_input)
+
+            fps_input = QSpinBox()
+            fps_input.setRange(0, 240)
+            fps_input.setSpecialValueText("Default")
+            fps_input.setValue(int(mode["fps"]))
+            row.addWidget(QLabel("FPS:"))
+            row.addWidget(fps_input)
+
+            layout.addLayout(row)
+            self.mode_inputs[mode_name] = (fourcc_input, width_input, height_input, fps_input)
+
+        warmup_layout = QHBoxLayout()
+        warmup_layout.addWidget(QLabel("Frames to discard after switching:"))
+        self.warmup_input = QSpinBox()
+        self.warmup_input.setRange(0, 30)
+        self.warmup_input.setValue(self.profile["warmup_frames"])
+        warmup_layout.addWidget(self.warmup_input)
+        layout.addLayout(warmup_layout)
+
+        buttons = QHBoxLayout()
+        save_button = QPushButton("Save")
+        save_button.clicked.connect(self.accept)
+        cancel_button = QPushButton("Cancel")
+        cancel_button.clicked.connect(self.reject)
+        buttons.addWidget(save_button)
+        buttons.addWidget(cancel_button)
+
+        layout.addLayout(buttons)
+        self.setLayout(layout)
+
+    def get_profile(self):
+        profile = {"warmup_frames": self.warmup_input.value()}
+        for mode_name, (fourcc_input, width_input, height_input, fps_input) in self.mode_inputs.items():
+            profile[mode_name] = {
+                "fourcc": fourcc_input.currentText(),
+                "width": width_input.value(),
+                "height": height_input.value(),
+                "fps": fps_input.value(),
+            }
+        return profile
 
 class CapturePage(QWidget):
     image_captured = pyqtSignal(str)
@@ -15,6 +99,17 @@ class CapturePage(QWidget):
         self.camera = None
         self.projects_file = 'projects.json'
         self.projects_folder = 'projects'
+        self.fps_meter = RateMeter()
+        self.dropped_frames = 0
+        self.last_tick = None
+        self.capture_latency = None
+        self.profile_key = None
+        self.profile = None
+        self.preview_mode = None
+        self.still_mode = None
+        self.preview_interval_ms = PREVIEW_INTERVAL_MS
+        self.stacking_worker = None
+        self.watcher = get_project_watcher(self.projects_folder)
         self.setup_ui()
 
     def setup_ui(self):
@@ -37,16 +132,48 @@ class CapturePage(QWidget):
         self.connect_button = QPushButton("Connect")
         self.connect_button.clicked.connect(self.connect_camera)
         device_layout.addWidget(self.connect_button)
+
+        profile_button = QPushButton("Profile...")
+        profile_button.clicked.connect(self.edit_profile)
+        device_layout.addWidget(profile_button)
+
+        self.overlay_checkbox = QCheckBox("Show metrics")
+        self.overlay_checkbox.toggled.connect(self.toggle_overlay)
+        device_layout.addWidget(self.overlay_checkbox)
         
         layout.addLayout(device_layout)
+
+        self.profile_label = QLabel("Camera not connected")
+        layout.addWidget(self.profile_label)
         
         self.image_label = QLabel()
         self.image_label.setMinimumSize(800, 600)
         layout.addWidget(self.image_label)
 
-        capture_button = QPushButton("Capture Image")
-        capture_button.clicked.connect(self.capture_image)
-        layout.addWidget(capture_button)
+        # Metrics overlay drawn on top of the preview
+        self.metrics_overlay = QLabel(self.image_label)
+        self.metrics_overlay.setStyleSheet(
+            "background-color: rgba(0, 0, 0, 160); color: lime; font-size: 11px; padding: 4px;")
+        self.metrics_overlay.move(8, 8)
+        self.metrics_overlay.hide()
+
+        # Multi-frame averaging
+        stacking_layout = QHBoxLayout()
+        stacking_layout.addWidget(QLabel("Frames to average:"))
+        self.frame_count_input = QSpinBox()
+        self.frame_count_input.setRange(1, 256)
+        self.frame_count_input.setValue(1)
+        stacking_layout.addWidget(self.frame_count_input)
+        stacking_layout.addWidget(QLabel("Stacking:"))
+        self.stack_method_dropdown = QComboBox()
+        self.stack_method_dropdown.addItems(STACK_METHODS)
+        stacking_layout.addWidget(self.stack_method_dropdown)
+        stacking_layout.addStretch()
+        layout.addLayout(stacking_layout)
+
+        self.capture_button = QPushButton("Capture Image")
+        self.capture_button.clicked.connect(self.capture_image)
+        layout.addWidget(self.capture_button)
 
         self.setLayout(layout)
 
@@ -61,11 +188,11 @@ class CapturePage(QWidget):
             self.project_dropdown.addItem(project['name'])
 
     def load_projects(self):
-        with open(self.projects_file, 'r') as f:
+        with metrics.timer('catalogue.load'), open(self.projects_file, 'r') as f:
             return json.load(f)
 
     def save_projects(self, projects):
-        with open(self.projects_file, 'w') as f:
+        with metrics.timer('catalogue.save'), open(self.projects_file, 'w') as f:
             json.dump(projects, f)
 
     def update_camera_list(self):
@@ -73,29 +200,155 @@ class CapturePage(QWidget):
         for i in range(10):  # Check first 10 camera indices
             cap = cv2.VideoCapture(i)
             if cap.isOpened():
-                self.device_dropdown.addItem(f"Camera {i}")
+                self.device_dropdown.addItem(f"Camera {i}", i)
                 cap.release()
 
+    def current_camera_index(self):
+        camera_index = self.device_dropdown.currentData()
+        return camera_index if camera_index is not None else self.device_dropdown.currentIndex()
+
+    def open_camera(self, camera_index):
+        self.camera = cv2.VideoCapture(camera_index)
+        if self.camera.isOpened():
+            self.profile_key = device_key(camera_index)
+            self.profile = get_profile(load_profiles(), self.profile_key)
+            self.still_mode = None
+            self.apply_capture_mode('preview')
+        return self.camera.isOpened()
+
+    def apply_capture_mode(self, mode_name):
+        requested = self.profile[mode_name]
+        accepted = apply_mode(self.camera, requested)
+        mismatches = mode_mismatches(requested, accepted)
+        # The profile label shows the details; only count how often drivers override a profile
+        if mismatches:
+            metrics.count(f'camera.mode_mismatch.{mode_name}')
+
+        if mode_name == 'preview':
+            self.preview_mode = accepted
+            self.preview_interval_ms = max(int(1000 / accepted['fps']), 1) if accepted['fps'] else PREVIEW_INTERVAL_MS
+        else:
+            self.still_mode = accepted
+        self.update_profile_label()
+        return accepted
+
+    def update_profile_label(self):
+        text = f"Preview: {describe_mode(self.preview_mode)}"
+        if not needs_mode_switch(self.profile):
+            text += "  |  Still: same as preview"
+        elif self.still_mode:
+            text += f"  |  Still: {describe_mode(self.still_mode)}"
+        else:
+            text += f"  |  Still: {describe_mode(self.profile['still'])} (requested)"
+        mismatches = mode_mismatches(self.profile['preview'], self.preview_mode)
+        if self.still_mode:
+            mismatches += mode_mismatches(self.profile['still'], self.still_mode)
+        self.profile_label.setStyleSheet("color: darkorange;" if mismatches else "")
+        self.profile_label.setToolTip("\n".join(mismatches))
+        self.profile_label.setText(text)
+
+    def edit_profile(self):
+        camera_index = self.current_camera_index()
+        if camera_index < 0:
+            QMessageBox.warning(self, "Error", "No camera selected")
+            return
+        key = device_key(camera_index)
+        profiles = load_profiles()
+        dialog = CameraProfileDialog(key, get_profile(profiles, key), self)
+        if dialog.exec_():
+            profiles[key] = dialog.get_profile()
+            save_profiles(profiles)
+            if self.camera and self.camera.isOpened() and self.profile_key == key:
+                self.timer.stop()
+                self.profile = get_profile(profiles, key)
+                self.still_mode = None
+                self.apply_capture_mode('preview')
+                self.start_preview_timer()
+
     def connect_camera(self):
         if self.camera:
             self.camera.release()
-        camera_index = self.device_dropdown.currentIndex()
-        self.camera = cv2.VideoCapture(camera_index)
-        if not self.camera.isOpened():
+        camera_index = self.current_camera_index()
+        if not self.open_camera(camera_index):
             QMessageBox.warning(self, "Error", f"Failed to open camera {camera_index}")
         else:
-            self.timer.start(30)
+            self.start_preview_timer()
+
+    def start_preview_timer(self):
+        self.last_tick = None
+        self.timer.start(self.preview_interval_ms)
+
+    def track_frame_timing(self):
+        now = time.perf_counter()
+        if self.last_tick is not None:
+            # Ticks that arrive late mean the preview skipped frames it should have shown
+            missed = int((now - self.last_tick) * 1000 / self.preview_interval_ms) - 1
+            if missed > 0:
+                self.dropped_frames += missed
+                metrics.count('preview.dropped', missed)
+        self.last_tick = now
+        return now
 
     def update_frame(self):
         if self.camera and self.camera.isOpened():
-            ret, frame = self.camera.read()
+            now = self.track_frame_timing()
+            with metrics.timer('preview.grab'):
+                ret, frame = self.camera.read()
             if ret:
-                frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-                h, w, ch = frame.shape
-                bytes_per_line = ch * w
-                q_image = QImage(frame.data, w, h, bytes_per_line, QImage.Format_RGB888)
-                self.image_label.setPixmap(QPixmap.fromImage(q_image).scaled(
-                    self.image_label.size(), Qt.KeepAspectRatio, Qt.SmoothTransformation))
+                with metrics.timer('preview.convert'):
+                    frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+                    h, w, ch = frame.shape
+                    bytes_per_line = ch * w
+                    q_image = QImage(frame.data, w, h, bytes_per_line, QImage.Format_RGB888)
+                with metrics.timer('preview.render'):
+                    self.image_label.setPixmap(QPixmap.fromImage(q_image).scaled(
+                        self.image_label.size(), Qt.KeepAspectRatio, Qt.SmoothTransformation))
+                self.fps_meter.tick(now)
+                metrics.count('preview.frames')
+            else:
+                self.dropped_frames += 1
+                metrics.count('preview.dropped')
+            if self.metrics_overlay.isVisible():
+                self.update_overlay()
+
+    def toggle_overlay(self, checked):
+        self.metrics_overlay.setVisible(checked)
+        if checked:
+            self.update_overlay()
+
+    def update_overlay(self):
+        latency = f"{self.capture_latency * 1000:.0f} ms" if self.capture_latency is not None else "-"
+        self.metrics_overlay.setText(f"FPS: {self.fps_meter.rate():.1f}\n"
+                                     f"Dropped frames: {self.dropped_frames}\n"
+                                     f"Capture latency: {latency}")
+        self.metrics_overlay.adjustSize()
+
+    def enter_still_mode(self):
+        # Switch the stream to the still profile for the capture, then go back to preview
+        self.timer.stop()
+        if not self.camera or not self.camera.isOpened():
+            return
+        if needs_mode_switch(self.profile):
+            self.apply_capture_mode('still')
+            for _ in range(self.profile['warmup_frames']):
+                self.camera.grab()
+
+    def leave_still_mode(self):
+        # The camera may have been stopped while a stacked capture was still being delivered
+        if not self.camera or not self.camera.isOpened():
+            return
+        if needs_mode_switch(self.profile):
+            self.apply_capture_mode('preview')
+        self.start_preview_timer()
+
+    def grab_still_frame(self):
+        if not needs_mode_switch(self.profile):
+            return self.camera.read()
+        self.enter_still_mode()
+        try:
+            return self.camera.read()
+        finally:
+            self.leave_still_mode()
 
     def capture_image(self):
         if not self.camera or not self.camera.isOpened():
@@ -107,35 +360,89 @@ class CapturePage(QWidget):
             QMessageBox.warning(self, "Error", "Please select a project")
             return
 
-        ret, frame = self.camera.read()
+        capture_start = time.perf_counter()
+        frame_count = self.frame_count_input.value()
+        if frame_count > 1:
+            self.start_stacked_capture(selected_project, frame_count, capture_start)
+            return
+
+        with metrics.timer('capture.grab'):
+            ret, frame = self.grab_still_frame()
         if ret:
-            project_folder = os.path.join(self.projects_folder, selected_project)
-            if not os.path.exists(project_folder):
-                os.makedirs(project_folder)
-
-            # Generate filename
-            timestamp = datetime.now().strftime("%Y%m%d-%H%M%S")
-            file_count = len([name for name in os.listdir(project_folder) if os.path.isfile(os.path.join(project_folder, name))])
-            filename = f"{timestamp}-{file_count+1:05d}.jpg"
-            
-            file_path = os.path.join(project_folder, filename)
-            cv2.imwrite(file_path, frame)
-
-            # Update project data
-            projects = self.load_projects()
-            for project in projects:
-                if project['name'] == selected_project:
-                    project['total_data'] += 1
-                    break
-            self.save_projects(projects)
-
-            QMessageBox.information(self, "Success", f"Image captured: {filename}")
-
-            # Emit signal that an image was captured
-            self.image_captured.emit(selected_project)
+            self.save_capture(selected_project, frame, capture_start)
         else:
             QMessageBox.warning(self, "Error", "Failed to capture image")
 
+    def start_stacked_capture(self, selected_project, frame_count, capture_start):
+        self.capture_button.setEnabled(False)
+        self.enter_still_mode()
+
+        self.stack_progress = QProgressDialog(f"Averaging {frame_count} frames...", None, 0, frame_count, self)
+        self.stack_progress.setWindowTitle("Capture")
+        self.stack_progress.setWindowModality(Qt.WindowModal)
+        self.stack_progress.setMinimumDuration(0)
+        self.stack_progress.show()
+
+        # Frames are grabbed and accumulated off the GUI thread, so only the running sum is kept
+        self.stacking_worker = StackingWorker(self.camera, frame_count, self.stack_method_dropdown.currentText(), self)
+        self.stacking_worker.progress.connect(lambda done, total: self.stack_progress.setValue(done))
+        self.stacking_worker.stacked.connect(
+            lambda frame: self.finish_stacked_capture(selected_project, frame, capture_start))
+        self.stacking_worker.failed.connect(self.stacked_capture_failed)
+        self.stacking_worker.start()
+
+    def finish_stacked_capture(self, selected_project, frame, capture_start):
+        self.stack_progress.close()
+        self.leave_still_mode()
+        self.capture_button.setEnabled(True)
+        metrics.observe('capture.stack', time.perf_counter() - capture_start)
+        self.save_capture(selected_project, frame, capture_start)
+
+    def stacked_capture_failed(self, message):
+        self.stack_progress.close()
+        self.leave_still_mode()
+        self.capture_button.setEnabled(True)
+        QMessageBox.warning(self, "Error", message)
+
+    def save_capture(self, selected_project, frame, capture_start):
+        project_folder = os.path.join(self.projects_folder, selected_project)
+        if not os.path.exists(project_folder):
+            os.makedirs(project_folder)
+
+        # Generate filename
+        timestamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+        file_count = self.watcher.file_count(selected_project)
+        filename = f"{timestamp}-{file_count+1:05d}.jpg"
+        
+        file_path = os.path.join(project_folder, filename)
+        with metrics.timer('capture.encode'):
+            ok, encoded = cv2.imencode('.jpg', frame)
+        if not ok:
+            QMessageBox.warning(self, "Error", "Failed to encode image")
+            return
+        with metrics.timer('capture.write'), open(file_path, 'wb') as f:
+            f.write(encoded.tobytes())
+        self.watcher.note_file(selected_project, filename)
+
+        # Update project data
+        projects = self.load_projects()
+        for project in projects:
+            if project['name'] == selected_project:
+                project['total_data'] = self.watcher.file_count(selected_project)
+                break
+        self.save_projects(projects)
+
+        self.capture_latency = time.perf_counter() - capture_start
+        metrics.observe('capture.total', self.capture_latency)
+        metrics.count('capture.images')
+        if self.metrics_overlay.isVisible():
+            self.update_overlay()
+
+        QMessageBox.information(self, "Success", f"Image captured: {filename}")
+
+        # Emit signal that an image was captured
+        self.image_captured.emit(selected_project)
+
     def showEvent(self, event):
         super().showEvent(event)
         self.update_project_list() 
@@ -154,21 +461,38 @@ class CapturePage(QWidget):
 
     def start_camera(self):
         if self.camera is None:
-            camera_index = self.device_dropdown.currentIndex()
-            self.camera = cv2.VideoCapture(camera_index)
+            self.open_camera(self.current_camera_index())
         if self.camera.isOpened():
-            self.timer.start(30)
+            self.start_preview_timer()
         else:
             QMessageBox.warning(self, "Error", "Failed to start camera")
 
+    def cancel_stacking(self):
+        worker, self.stacking_worker = self.stacking_worker, None
+        if worker is None or not worker.isRunning():
+            return
+        # Disconnect first so a result queued before the interruption is not delivered
+        # after the camera has gone; the worker stops after its current frame read
+        worker.requestInterruption()
+        worker.progress.disconnect()
+        worker.stacked.disconnect()
+        worker.failed.disconnect()
+        worker.wait()
+        self.stack_progress.close()
+        self.capture_button.setEnabled(True)
+
     def stop_camera(self):
+        self.cancel_stacking()
         if self.camera:
             self.timer.stop()
             self.camera.release()
             self.camera = None
         self.image_label.clear()
+        self.profile_label.setText("Camera not connected")
+        self.profile_label.setStyleSheet("")
 
     def closeEvent(self, event):
+        self.cancel_stacking()
         if self.camera:
             self.camera.release()
         super().closeEvent(event)
\ No newline at end of file
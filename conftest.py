@@ -0,0 +1 @@
+# Keeps the repository root importable when the suite is run with a bare `pytest`
@@ -0,0 +1,84 @@
+import cv2
+import numpy as np
+from PyQt5.QtCore import QThread, pyqtSignal
+
+STACK_METHODS = ['Mean', 'Sigma-clipped', 'Median']
+# Scales the median absolute deviation to the standard deviation of normally distributed noise
+MAD_TO_SIGMA = 1.4826
+
+
+class FrameStacker:
+    def __init__(self, method='Mean', window=5, sigma=2.5, strip_rows=128):
+        self.method = method
+        self.window = window
+        self.sigma = sigma
+        self.strip_rows = strip_rows
+        self.accumulator = None
+        self.count = 0
+        self.window_frames = []
+
+    def add(self, frame):
+        if self.accumulator is None:
+            self.accumulator = np.zeros(frame.shape, np.float32)
+        if self.method == 'Mean':
+            cv2.accumulate(frame, self.accumulator)
+            self.count += 1
+            return
+        self.window_frames.append(frame)
+        if len(self.window_frames) >= self.window:
+            self.flush_window()
+
+    def flush_window(self):
+        frames = self.window_frames
+        n = len(frames)
+        # Work through the window in row strips so the float copy stays small at full sensor size
+        for y0 in range(0, frames[0].shape[0], self.strip_rows):
+            y1 = y0 + self.strip_rows
+            strip = np.stack([f[y0:y1] for f in frames]).astype(np.float32)
+            if self.method == 'Median':
+                combined = np.median(strip, axis=0)
+            else:
+                # Clip around the median using the MAD; a mean/std bound can never reject anything
+                # in a window this small, because the outlier inflates the std it is measured against
+                deviation = np.abs(strip - np.median(strip, axis=0))
+                limit = self.sigma * MAD_TO_SIGMA * np.median(deviation, axis=0)
+                keep = deviation <= limit
+                # The sample closest to the median always survives, whatever sigma is
+                keep |= deviation == deviation.min(axis=0)
+                combined = (strip * keep).sum(axis=0) / keep.sum(axis=0)
+            self.accumulator[y0:y1] += combined * n
+        self.count += n
+        self.window_frames = []
+
+    def result(self):
+        if self.window_frames:
+            self.flush_window()
+        if not self.count:
+            return None
+        return np.clip(self.accumulator / self.count + 0.5, 0, 255).astype(np.uint8)
+
+
+class StackingWorker(QThread):
+    progress = pyqtSignal(int, int)
+    stacked = pyqtSignal(object)
+    failed = pyqtSignal(str)
+
+    def __init__(self, camera, frame_count, method, parent=None):
+        super().__init__(parent)
+        self.camera = camera
+        self.frame_count = frame_count
+        self.stacker = FrameStacker(method)
+
+    def run(self):
+        for i in range(self.frame_count):
+            # Stopping the camera interrupts the capture; nothing is emitted for a cancelled stack
+            if self.isInterruptionRequested():
+                return
+            ret, frame = self.camera.read()
+            if not ret:
+                self.failed.emit(f"Failed to read frame {i + 1} of {self.frame_count}")
+                return
+            self.stacker.add(frame)
+            self.progress.emit(i + 1, self.frame_count)
+        if not self.isInterruptionRequested():
+            self.stacked.emit(self.stacker.result())
@@ -0,0 +1,147 @@
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, wait
+import cv2
+from PyQt5.QtGui import QImage, QImageReader
+from PyQt5.QtCore import Qt
+
+DEFAULT_BUDGET_MB = int(os.environ.get('IMAGE_CACHE_MB', '512'))
+
+
+class ImageCache:
+    def __init__(self, budget_bytes, prefetch_workers=2):
+        self.budget_bytes = budget_bytes
+        self.entries = OrderedDict()
+        self.used_bytes = 0
+        self.lock = threading.Lock()
+        # path -> future of a prefetch still decoding it
+        self.pending = {}
+        self.executor = ThreadPoolExecutor(max_workers=prefetch_workers, thread_name_prefix='image-prefetch')
+
+    def make_key(self, path, thumbnail_size=None):
+        # Files can be deleted or replaced under the app at any time; a missing file has no key
+        try:
+            return os.path.abspath(path), os.stat(path).st_mtime_ns, thumbnail_size
+        except OSError:
+            return None
+
+    def lookup(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                self.entries.move_to_end(key)
+                return entry[0]
+        return None
+
+    def store(self, key, value, nbytes):
+        if nbytes > self.budget_bytes:
+            return
+        with self.lock:
+            if key in self.entries:
+                return
+            self.entries[key] = (value, nbytes)
+            self.used_bytes += nbytes
+            self.evict()
+
+    def evict(self):
+        while self.used_bytes > self.budget_bytes and self.entries:
+            _, (_, nbytes) = self.entries.popitem(last=False)
+            self.used_bytes -= nbytes
+
+    def set_budget(self, budget_bytes):
+        with self.lock:
+            self.budget_bytes = budget_bytes
+            self.evict()
+
+    def get(self, path):
+        key = self.make_key(path)
+        if key is None:
+            return None
+        image = self.lookup(key)
+        if image is None:
+            with self.lock:
+                future = self.pending.get(path)
+            if future is not None:
+                # A prefetch is already decoding this file; wait for it instead of decoding it twice
+                wait([future])
+                image = self.lookup(key)
+        if image is None:
+            image = self.decode(path, key)
+        return image
+
+    def decode(self, path, key):
+        try:
+            image = cv2.imread(path)
+        except cv2.error:
+            # Corrupt files and images beyond OpenCV's pixel limit raise instead of returning None
+            return None
+        if image is None:
+            return None
+        # Cached arrays are shared between viewers, so nobody may edit them in place
+        image.flags.writeable = False
+        self.store(key, image, image.nbytes)
+        return image
+
+    def get_qimage(self, path):
+        image = self.get(path)
+        if image is None:
+            return None, None
+        return qimage_view(image)
+
+    def get_thumbnail(self, path, size):
+        key = self.make_key(path, size)
+        if key is None:
+            return None
+        thumbnail = self.lookup(key)
+        if thumbnail is None:
+            # Let the JPEG decoder scale while decoding instead of decoding full size first
+            reader = QImageReader(path)
+            source_size = reader.size()
+            if source_size.isValid():
+                reader.setScaledSize(source_size.scaled(size, size, Qt.KeepAspectRatio))
+            thumbnail = reader.read()
+            if thumbnail.isNull():
+                return None
+            self.store(key, thumbnail, thumbnail.sizeInBytes())
+        return thumbnail
+
+    def prefetch(self, paths):
+        for path in paths:
+            key = self.make_key(path) if path else None
+            if key is None or self.lookup(key) is not None:
+                continue
+            with self.lock:
+                if path not in self.pending:
+                    self.pending[path] = self.executor.submit(self.prefetch_one, path, key)
+
+    def prefetch_one(self, path, key):
+        try:
+            if self.lookup(key) is None:
+                self.decode(path, key)
+        finally:
+            with self.lock:
+                self.pending.pop(path, None)
+
+    def invalidate(self, path):
+        path = os.path.abspath(path)
+        with self.lock:
+            for key in [k for k in self.entries if k[0] == path]:
+                _, nbytes = self.entries.pop(key)
+                self.used_bytes -= nbytes
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.used_bytes = 0
+
+
+def qimage_view(image):
+    # Wraps the NumPy buffer without copying; the caller must keep the returned array alive
+    if not image.flags.c_contiguous:
+        image = image.copy()
+    height, width = image.shape[:2]
+    return image, QImage(image.data, width, height, image.strides[0], QImage.Format_BGR888)
+
+
+image_cache = ImageCache(DEFAULT_BUDGET_MB * 1024 * 1024)
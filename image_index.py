@@ -0,0 +1,229 @@
+import json
+import os
+import re
+import sqlite3
+from datetime import datetime
+
+INDEX_FILE = 'image_index.db'
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.bmp', '.gif')
+CAPTURE_NAME = re.compile(r'^(\d{8}-\d{6})-\d{5}')
+SORT_COLUMNS = {
+    'captured_at': 'i.captured_at',
+    'project': 'i.project',
+    'filename': 'i.filename',
+    'size': 'i.size',
+    'metric': 'm.value',
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS projects (
+    name TEXT PRIMARY KEY,
+    sync_status TEXT
+);
+CREATE TABLE IF NOT EXISTS images (
+    id INTEGER PRIMARY KEY,
+    project TEXT NOT NULL,
+    filename TEXT NOT NULL,
+    captured_at REAL NOT NULL,
+    size INTEGER NOT NULL,
+    mtime REAL NOT NULL,
+    UNIQUE (project, filename)
+);
+CREATE INDEX IF NOT EXISTS images_captured_at ON images (captured_at);
+CREATE INDEX IF NOT EXISTS images_project_captured_at ON images (project, captured_at);
+CREATE INDEX IF NOT EXISTS images_size ON images (size);
+CREATE TABLE IF NOT EXISTS metrics (
+    image_id INTEGER NOT NULL REFERENCES images (id) ON DELETE CASCADE,
+    name TEXT NOT NULL,
+    value REAL NOT NULL,
+    PRIMARY KEY (image_id, name)
+);
+CREATE INDEX IF NOT EXISTS metrics_name_value ON metrics (name, value);
+"""
+
+
+def parse_capture_time(filename, fallback):
+    # Names written by CapturePage start with YYYYMMDD-HHMMSS; anything else uses the file time
+    match = CAPTURE_NAME.match(filename)
+    if match:
+        try:
+            return datetime.strptime(match.group(1), "%Y%m%d-%H%M%S").timestamp()
+        except ValueError:
+            pass
+    return fallback
+
+
+class ImageIndex:
+    def __init__(self, index_file=INDEX_FILE, projects_file='projects.json', projects_folder='projects'):
+        self.index_file = index_file
+        self.projects_file = projects_file
+        self.projects_folder = projects_folder
+        self.progress_callback = None
+        self.should_stop = None
+        self.conn = sqlite3.connect(index_file)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA foreign_keys = ON")
+        self.conn.execute("PRAGMA journal_mode = WAL")
+        self.conn.executescript(SCHEMA)
+        # Serialised analysis per project as last written to the metrics table
+        self.stored_analysis = {}
+
+    def load_projects(self):
+        with open(self.projects_file, 'r') as f:
+            return json.load(f)
+
+    def report(self, done, total):
+        if self.progress_callback:
+            self.progress_callback(done, total)
+
+    def refresh(self, rescan=True):
+        # Without rescan only projects new to the index are scanned; the project watcher keeps the rest current
+        projects = self.load_projects()
+        known = {row['name'] for row in self.conn.execute("SELECT name FROM projects")}
+        with self.conn:
+            self.conn.execute("DELETE FROM projects")
+            self.conn.executemany("INSERT INTO projects (name, sync_status) VALUES (?, ?)",
+                                  [(p['name'], p.get('sync_status')) for p in projects])
+            self.conn.execute("DELETE FROM images WHERE project NOT IN (SELECT name FROM projects)")
+        for i, project in enumerate(projects):
+            if self.should_stop and self.should_stop():
+                break
+            if rescan or project['name'] not in known:
+                self.refresh_project(project['name'])
+            self.update_analysis(project['name'], project.get('analysis', {}))
+            self.report(i + 1, len(projects))
+        # Without statistics the planner starts metric searches from the metric range and sorts afterwards;
+        # with them it walks the capture-time index instead
+        self.conn.execute("ANALYZE" if rescan else "PRAGMA optimize")
+        return projects
+
+    def refresh_project(self, project_name):
+        project_folder = os.path.join(self.projects_folder, project_name)
+        existing = {row['filename']: (row['id'], row['size'], row['mtime']) for row in self.conn.execute(
+            "SELECT id, filename, size, mtime FROM images WHERE project = ?", (project_name,))}
+
+        seen = set()
+        changed = []
+        if os.path.isdir(project_folder):
+            with os.scandir(project_folder) as entries:
+                for entry in entries:
+                    if not entry.name.lower().endswith(IMAGE_EXTENSIONS) or not entry.is_file():
+                        continue
+                    seen.add(entry.name)
+                    stat = entry.stat()
+                    known = existing.get(entry.name)
+                    if known is None or known[1] != stat.st_size or known[2] != stat.st_mtime:
+                        changed.append((project_name, entry.name, parse_capture_time(entry.name, stat.st_mtime),
+                                        stat.st_size, stat.st_mtime))
+
+        self.store_images(project_name, changed, [name for name in existing if name not in seen],
+                          any(row[1] not in existing for row in changed))
+
+    def update_files(self, project_name, changed, removed):
+        # Applies a watcher event by statting only the files it names
+        rows = []
+        removed = list(removed)
+        for filename in changed:
+            if not filename.lower().endswith(IMAGE_EXTENSIONS):
+                continue
+            try:
+                stat = os.stat(os.path.join(self.projects_folder, project_name, filename))
+            except OSError:
+                removed.append(filename)
+                continue
+            rows.append((project_name, filename, parse_capture_time(filename, stat.st_mtime),
+                         stat.st_size, stat.st_mtime))
+        self.store_images(project_name, rows, removed, bool(rows))
+
+    def store_images(self, project_name, rows, removed, new_images):
+        with self.conn:
+            self.conn.executemany(
+                "INSERT INTO images (project, filename, captured_at, size, mtime) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT (project, filename) DO UPDATE SET "
+                "captured_at = excluded.captured_at, size = excluded.size, mtime = excluded.mtime", rows)
+            self.conn.executemany("DELETE FROM images WHERE project = ? AND filename = ?",
+                                  [(project_name, filename) for filename in removed])
+        # New images may have analysis results waiting for them, so the next refresh stores them again
+        if new_images:
+            self.stored_analysis.pop(project_name, None)
+
+    def update_analysis(self, project_name, analysis):
+        # Metrics are only rewritten when a project's analysis results actually changed
+        key = json.dumps(analysis, sort_keys=True)
+        if self.stored_analysis.get(project_name) == key:
+            return
+        with self.conn:
+            self.store_analysis(project_name, analysis)
+        self.stored_analysis[project_name] = key
+
+    def store_analysis(self, project_name, analysis):
+        # Analysis results live in projects.json as {"analysis": {filename: {metric: value}}}
+        ids = {row['filename']: row['id'] for row in self.conn.execute(
+            "SELECT id, filename FROM images WHERE project = ?", (project_name,))}
+        self.conn.execute("DELETE FROM metrics WHERE image_id IN (SELECT id FROM images WHERE project = ?)",
+                          (project_name,))
+        rows = [(ids[filename], name, float(value))
+                for filename, values in analysis.items() if filename in ids
+                for name, value in values.items() if isinstance(value, (int, float))]
+        self.conn.executemany("INSERT INTO metrics (image_id, name, value) VALUES (?, ?, ?)", rows)
+
+    def metric_names(self):
+        return [row[0] for row in self.conn.execute("SELECT DISTINCT name FROM metrics ORDER BY name")]
+
+    def search(self, project=None, start=None, end=None, min_size=None, max_size=None, sync_status=None,
+               metric=None, metric_min=None, metric_max=None, order_by='captured_at', descending=True,
+               limit=1000):
+        if order_by not in SORT_COLUMNS or (order_by == 'metric' and not metric):
+            raise ValueError(f"Cannot sort by {order_by}")
+
+        columns = "i.project, i.filename, i.captured_at, i.size, p.sync_status"
+        joins = "JOIN projects p ON p.name = i.project"
+        conditions = []
+        params = []
+        if metric:
+            columns += ", m.value AS metric_value"
+            joins += " JOIN metrics m ON m.image_id = i.id AND m.name = ?"
+            params.append(metric)
+            if metric_min is not None:
+                conditions.append("m.value >= ?")
+                params.append(metric_min)
+            if metric_max is not None:
+                conditions.append("m.value <= ?")
+                params.append(metric_max)
+        if project:
+            conditions.append("i.project = ?")
+            params.append(project)
+        if start:
+            conditions.append("i.captured_at >= ?")
+            params.append(start.timestamp())
+        if end:
+            conditions.append("i.captured_at <= ?")
+            params.append(end.timestamp())
+        if min_size is not None:
+            conditions.append("i.size >= ?")
+            params.append(min_size)
+        if max_size is not None:
+            conditions.append("i.size <= ?")
+            params.append(max_size)
+        if sync_status:
+            conditions.append("p.sync_status = ?")
+            params.append(sync_status)
+
+        query = f"SELECT {columns} FROM images i {joins}"
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += f" ORDER BY {SORT_COLUMNS[order_by]} {'DESC' if descending else 'ASC'}, i.id"
+        if limit:
+            query += " LIMIT ?"
+            params.append(limit)
+
+        results = []
+        for row in self.conn.execute(query, params):
+            result = dict(row)
+            result['path'] = os.path.join(self.projects_folder, row['project'], row['filename'])
+            result['captured_at'] = datetime.fromtimestamp(row['captured_at'])
+            results.append(result)
+        return results
+
+    def close(self):
+        self.conn.close()
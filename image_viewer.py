@@ -1,22 +1,29 @@
+import os
 import cv2
 import numpy as np
 from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton, 
                              QSlider, QFileDialog, QInputDialog, QScrollArea)
 from PyQt5.QtGui import QImage, QPixmap, QPainter, QPen, QColor
 from PyQt5.QtCore import Qt, QPoint
+from image_cache import image_cache, qimage_view
 
 class ImageViewer(QWidget):
-    def __init__(self, image_path):
+    def __init__(self, image_path, image_paths=None):
         super().__init__()
-        self.image_path = image_path
-        self.original_image = cv2.imread(image_path)
-        self.displayed_image = self.original_image.copy()
-        self.zoom_factor = 1
+        self.image_paths = image_paths or [image_path]
         self.drawing = False
         self.last_point = QPoint()
         self.current_tool = None
+        self.load_image(image_path)
         self.setup_ui()
 
+    def load_image(self, image_path):
+        self.image_path = image_path
+        # The decoded image comes from the shared cache and is read-only; edits always produce new arrays
+        self.original_image = image_cache.get(image_path)
+        self.displayed_image = self.original_image
+        self.zoom_factor = 1
+
     def setup_ui(self):
         main_layout = QVBoxLayout()
 
@@ -39,6 +46,14 @@ class ImageViewer(QWidget):
 
         # Tools
         tools_layout = QHBoxLayout()
+
+        self.prev_btn = QPushButton("< Previous")
+        self.prev_btn.clicked.connect(lambda: self.navigate(-1))
+        tools_layout.addWidget(self.prev_btn)
+
+        self.next_btn = QPushButton("Next >")
+        self.next_btn.clicked.connect(lambda: self.navigate(1))
+        tools_layout.addWidget(self.next_btn)
         
         zoom_in_btn = QPushButton("Zoom In")
         zoom_in_btn.clicked.connect(self.zoom_in)
@@ -73,11 +88,59 @@ class ImageViewer(QWidget):
         self.image_label.mousePressEvent = self.mouse_press_event
         self.image_label.mouseMoveEvent = self.mouse_move_event
         self.image_label.mouseReleaseEvent = self.mouse_release_event
+        self.update_navigation()
+
+    def set_image_list(self, image_paths, image_path):
+        self.image_paths = image_paths
+        self.show_image(image_path)
+
+    def update_image_list(self, image_paths):
+        old_paths = self.image_paths
+        self.image_paths = list(image_paths)
+        if self.image_path in self.image_paths or not self.image_paths:
+            self.update_navigation()
+            return
+        # The image on screen was removed, so move on to the one that took its place
+        position = old_paths.index(self.image_path) if self.image_path in old_paths else 0
+        following = [path for path in old_paths[position + 1:] if path in self.image_paths]
+        self.show_image(following[0] if following else self.image_paths[-1])
+
+    def show_image(self, image_path):
+        self.load_image(image_path)
+        self.setWindowTitle(os.path.basename(image_path))
+        self.update_image()
+        self.update_navigation()
+
+    def navigate(self, step):
+        if self.image_path not in self.image_paths:
+            return
+        index = self.image_paths.index(self.image_path) + step
+        while 0 <= index < len(self.image_paths):
+            if image_cache.get(self.image_paths[index]) is not None:
+                self.show_image(self.image_paths[index])
+                return
+            # Skip files deleted since the list was built
+            del self.image_paths[index]
+            if step < 0:
+                index -= 1
+        self.update_navigation()
+
+    def update_navigation(self):
+        index = self.image_paths.index(self.image_path) if self.image_path in self.image_paths else -1
+        self.prev_btn.setEnabled(index > 0)
+        self.next_btn.setEnabled(0 <= index < len(self.image_paths) - 1)
+        # Decode the neighbours in the background so stepping through images is instant
+        if index >= 0:
+            image_cache.prefetch(self.image_paths[max(index - 1, 0):index + 2])
 
     def update_image(self):
-        height, width = self.displayed_image.shape[:2]
-        bytes_per_line = 3 * width
-        q_image = QImage(self.displayed_image.data, width, height, bytes_per_line, QImage.Format_RGB888).rgbSwapped()
+        if self.displayed_image is None:
+            self.qimage_source = None
+            self.pixmap = QPixmap()
+            self.image_label.setText(f"Could not load {os.path.basename(self.image_path)}")
+            return
+        # The QImage is a view over the NumPy buffer, so no intermediate copy is made before the pixmap
+        self.qimage_source, q_image = qimage_view(self.displayed_image)
         self.pixmap = QPixmap.fromImage(q_image)
         self.image_label.setPixmap(self.pixmap)
         self.image_label.adjustSize()
@@ -126,6 +189,8 @@ class ImageViewer(QWidget):
         self.apply_zoom()
 
     def apply_zoom(self):
+        if self.original_image is None:
+            return
         height, width = self.original_image.shape[:2]
         new_height, new_width = int(height * self.zoom_factor), int(width * self.zoom_factor)
         self.displayed_image = cv2.resize(self.original_image, (new_width, new_height))
@@ -161,6 +226,8 @@ class ImageViewer(QWidget):
             self.update_image()
 
     def resize_image(self):
+        if self.displayed_image is None:
+            return
         new_width, ok = QInputDialog.getInt(self, "Resize Image", "Enter new width:", 
                                             self.displayed_image.shape[1], 1, 10000)
         if ok:
@@ -170,6 +237,8 @@ class ImageViewer(QWidget):
             self.update_image()
 
     def save_image(self):
+        if self.displayed_image is None:
+            return
         file_name = self.image_path.split('/')[-1].split('.')[0]
         save_path, _ = QFileDialog.getSaveFileName(self, "Save Image", 
                                                    f"{file_name}-edited.jpg", 
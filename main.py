@@ -4,6 +4,8 @@ from project_page import ProjectPage
 from capture_page import CapturePage
 from sync_page import SyncPage
 from action_page import ActionPage
+from search_page import SearchPage
+from metrics import metrics
 
 class MicroscopeApp(QMainWindow):
     def __init__(self):
@@ -22,10 +24,12 @@ class MicroscopeApp(QMainWindow):
         self.project_btn = QPushButton("Project")
         capture_btn = QPushButton("Capture")
         sync_btn = QPushButton("Sync")
+        search_btn = QPushButton("Search")
         
         sidebar_layout.addWidget(self.project_btn)
         sidebar_layout.addWidget(capture_btn)
         sidebar_layout.addWidget(sync_btn)
+        sidebar_layout.addWidget(search_btn)
         sidebar_layout.addStretch()
         
         sidebar.setLayout(sidebar_layout)
@@ -37,15 +41,18 @@ class MicroscopeApp(QMainWindow):
         self.project_page = ProjectPage(self.content_area)
         self.capture_page = CapturePage()
         self.sync_page = SyncPage()
+        self.search_page = SearchPage()
 
         self.content_area.addWidget(self.project_page)
         self.content_area.addWidget(self.capture_page)
         self.content_area.addWidget(self.sync_page)
+        self.content_area.addWidget(self.search_page)
 
         # Connect sidebar buttons
         self.project_btn.clicked.connect(lambda: self.change_page(0))
         capture_btn.clicked.connect(lambda: self.change_page(1))
         sync_btn.clicked.connect(lambda: self.change_page(2))
+        search_btn.clicked.connect(lambda: self.change_page(3))
 
         # Connect the image_captured signal to update_project_display slot
         self.capture_page.image_captured.connect(self.project_page.update_project_display)
@@ -53,6 +60,9 @@ class MicroscopeApp(QMainWindow):
         # Connect project page to action page
         self.project_page.switch_to_action_page.connect(self.show_action_page)
 
+        # Open search results in the thumbnail grid
+        self.search_page.open_in_grid.connect(self.show_action_page)
+
         # Add sidebar and content area to main layout
         main_layout.addWidget(sidebar)
         main_layout.addWidget(self.content_area)
@@ -73,8 +83,8 @@ class MicroscopeApp(QMainWindow):
         else:
             self.capture_page.stop_camera()
 
-    def show_action_page(self, project_name):
-        action_page = ActionPage(project_name, self.project_page.projects_folder)
+    def show_action_page(self, project_name, filenames=None):
+        action_page = ActionPage(project_name, self.project_page.projects_folder, filenames)
         action_page.go_back_signal.connect(self.go_back_to_projects)
         self.content_area.addWidget(action_page)
         self.content_area.setCurrentWidget(action_page)
@@ -100,6 +110,8 @@ if __name__ == "__main__":
             font-size: 12px;
         }
     """)
+    app.aboutToQuit.connect(metrics.flush)
     window = MicroscopeApp()
+    app.aboutToQuit.connect(window.search_page.close_index)
     window.show()
     sys.exit(app.exec_())
\ No newline at end of file
@@ -0,0 +1,140 @@
+import json
+import os
+import platform
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+
+class NullTimer:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+
+NULL_TIMER = NullTimer()
+
+
+class Timer:
+    __slots__ = ('metrics', 'name', 'start')
+
+    def __init__(self, metrics, name):
+        self.metrics = metrics
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.metrics.observe(self.name, time.perf_counter() - self.start)
+        return False
+
+
+class Metrics:
+    def __init__(self, enabled=False, log_path='metrics.jsonl', flush_interval=60,
+                 max_log_bytes=5 * 1024 * 1024, log_backups=3):
+        self.enabled = enabled
+        self.log_path = log_path
+        self.flush_interval = flush_interval
+        self.max_log_bytes = max_log_bytes
+        self.log_backups = log_backups
+        self.lock = threading.Lock()
+        self.counters = {}
+        self.timers = {}
+        self.window_start = time.time()
+
+    def timer(self, name):
+        if not self.enabled:
+            return NULL_TIMER
+        return Timer(self, name)
+
+    def observe(self, name, seconds):
+        if not self.enabled:
+            return
+        with self.lock:
+            stats = self.timers.get(name)
+            if stats is None:
+                self.timers[name] = [1, seconds, seconds]
+            else:
+                stats[0] += 1
+                stats[1] += seconds
+                if seconds > stats[2]:
+                    stats[2] = seconds
+        self.maybe_flush()
+
+    def count(self, name, value=1):
+        if not self.enabled:
+            return
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+        self.maybe_flush()
+
+    def snapshot(self):
+        with self.lock:
+            return self.build_snapshot()
+
+    def build_snapshot(self):
+        return {
+            "counters": dict(self.counters),
+            "timers": {name: {"count": n, "total_ms": total * 1000, "mean_ms": total * 1000 / n,
+                              "max_ms": worst * 1000}
+                       for name, (n, total, worst) in self.timers.items()},
+        }
+
+    def maybe_flush(self):
+        if time.time() - self.window_start >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        if not self.enabled:
+            return
+        # Snapshot and reset under one lock so nothing recorded in between is lost
+        with self.lock:
+            snapshot = self.build_snapshot()
+            self.counters.clear()
+            self.timers.clear()
+            window_start, self.window_start = self.window_start, time.time()
+        if not snapshot["counters"] and not snapshot["timers"]:
+            return
+
+        record = {
+            "time": datetime.now().isoformat(timespec='seconds'),
+            "host": platform.node(),
+            "window_s": round(time.time() - window_start, 3),
+            **snapshot,
+        }
+        try:
+            self.rotate_log()
+            with open(self.log_path, 'a') as f:
+                f.write(json.dumps(record) + '\n')
+        except OSError as e:
+            print(f"Failed to write metrics log: {e}")
+
+    def rotate_log(self):
+        if not os.path.exists(self.log_path) or os.path.getsize(self.log_path) < self.max_log_bytes:
+            return
+        for i in range(self.log_backups - 1, 0, -1):
+            if os.path.exists(f"{self.log_path}.{i}"):
+                os.replace(f"{self.log_path}.{i}", f"{self.log_path}.{i + 1}")
+        os.replace(self.log_path, f"{self.log_path}.1")
+
+
+class RateMeter:
+    def __init__(self, window=60):
+        self.times = deque(maxlen=window)
+
+    def tick(self, now=None):
+        self.times.append(time.perf_counter() if now is None else now)
+
+    def rate(self):
+        if len(self.times) < 2 or self.times[-1] == self.times[0]:
+            return 0.0
+        return (len(self.times) - 1) / (self.times[-1] - self.times[0])
+
+
+metrics = Metrics(enabled=os.environ.get('MICROSCOPE_METRICS', '0') == '1',
+                  log_path=os.environ.get('MICROSCOPE_METRICS_LOG', 'metrics.jsonl'))
@@ -0,0 +1,322 @@
+import math
+import os
+import tempfile
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+import cv2
+import numpy as np
+from PyQt5.QtCore import QThread, pyqtSignal
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.bmp')
+MOSAIC_SUFFIX = '-mosaic'
+# JPEG stores width and height in 16 bits and libjpeg refuses anything above 65500
+MAX_JPEG_SIDE = 65500
+# The result has to open in the viewer: cv2.imread refuses more than 2^30 pixels, and QImage/QPixmap
+# refuse more than 2 GB at up to 4 bytes per pixel, which is the tighter of the two
+MAX_MOSAIC_PIXELS = min(1 << 30, (2 ** 31 - 1) // 4)
+# Captures further apart than this in capture order are not matched; it covers the previous row of
+# raster scans up to 11 fields wide and keeps matching linear in the number of images
+DEFAULT_PAIR_DISTANCE = 12
+
+
+class ProvisionalPlacement:
+    # Union-find that also keeps each capture's offset from the root of its set, so the shift between
+    # two connected captures is known before they are matched
+    def __init__(self, count):
+        self.parent = list(range(count))
+        self.offset = np.zeros((count, 2))
+
+    def find(self, i):
+        path = []
+        while self.parent[i] != i:
+            path.append(i)
+            i = self.parent[i]
+        root = i
+        # Compress from the root down so each offset is added to an already root-relative one
+        for node in reversed(path):
+            parent = self.parent[node]
+            if parent != root:
+                self.offset[node] += self.offset[parent]
+                self.parent[node] = root
+        return root
+
+    def relative(self, i, j):
+        if self.find(i) != self.find(j):
+            return None
+        return self.offset[j] - self.offset[i]
+
+    def union(self, i, j, dx, dy):
+        # Position of j relative to i is (dx, dy)
+        root_i, root_j = self.find(i), self.find(j)
+        if root_i == root_j:
+            return
+        self.offset[root_j] = self.offset[i] + (dx, dy) - self.offset[j]
+        self.parent[root_j] = root_i
+
+
+class MosaicStitcher:
+    def __init__(self, image_paths, tile_size=2048, match_scale=0.25, max_workers=None,
+                 max_cached_images=8, min_matches=12, max_pair_distance=DEFAULT_PAIR_DISTANCE):
+        self.image_paths = list(image_paths)
+        self.tile_size = tile_size
+        self.match_scale = match_scale
+        self.max_workers = max_workers or min(8, os.cpu_count() or 1)
+        self.max_cached_images = max_cached_images
+        self.min_matches = min_matches
+        # Only pairs at most this far apart in capture order are matched; None matches every pair
+        self.max_pair_distance = max_pair_distance
+        self.placed = []
+        self.image_sizes = []
+        self.offsets = []
+        self.notes = []
+        self.scale = 1.0
+        self.progress_callback = None
+        self._image_cache = OrderedDict()
+        self._weight_cache = {}
+
+    def report(self, stage, done, total):
+        if self.progress_callback:
+            self.progress_callback(stage, done, total)
+
+    # Registration
+
+    def load_features(self, path):
+        image = cv2.imread(path, cv2.IMREAD_GRAYSCALE)
+        if image is None:
+            raise ValueError(f"Failed to read image: {path}")
+        small = cv2.resize(image, None, fx=self.match_scale, fy=self.match_scale,
+                           interpolation=cv2.INTER_AREA)
+        orb = cv2.ORB_create(nfeatures=2000)
+        keypoints, descriptors = orb.detectAndCompute(small, None)
+        points = np.float32([kp.pt for kp in keypoints]) / self.match_scale
+        return (image.shape[1], image.shape[0]), points, descriptors
+
+    def register_pair(self, features_a, features_b):
+        _, points_a, descriptors_a = features_a
+        _, points_b, descriptors_b = features_b
+        if descriptors_a is None or descriptors_b is None:
+            return None
+
+        matcher = cv2.BFMatcher(cv2.NORM_HAMMING)
+        good = []
+        for pair in matcher.knnMatch(descriptors_b, descriptors_a, k=2):
+            if len(pair) == 2 and pair[0].distance < 0.75 * pair[1].distance:
+                good.append(pair[0])
+        if len(good) < self.min_matches:
+            return None
+
+        src = points_b[[m.queryIdx for m in good]]
+        dst = points_a[[m.trainIdx for m in good]]
+        transform, inliers = cv2.estimateAffinePartial2D(src, dst, method=cv2.RANSAC,
+                                                         ransacReprojThreshold=3.0)
+        if transform is None or int(inliers.sum()) < self.min_matches:
+            return None
+        # Stage moves are pure translations, so only the shift is kept
+        return float(transform[0, 2]), float(transform[1, 2]), int(inliers.sum())
+
+    def pair_batches(self):
+        total = len(self.image_paths)
+        max_distance = min(self.max_pair_distance or total, total - 1)
+        # Neighbours in capture order first, then the longest jumps, which link the rows of a raster scan;
+        # by then most captures are connected and pairs that cannot overlap are skipped without matching
+        return [[(i, i + distance) for i in range(total - distance)]
+                for distance in [1] + list(range(max_distance, 1, -1))]
+
+    def may_overlap(self, placement, sizes, i, j):
+        shift = placement.relative(i, j)
+        if shift is None:
+            return True
+        (width_i, height_i), (width_j, height_j) = sizes[i], sizes[j]
+        return -width_j < shift[0] < width_i and -height_j < shift[1] < height_i
+
+    def largest_component(self, placement):
+        components = {}
+        for i in range(len(self.image_paths)):
+            components.setdefault(placement.find(i), []).append(i)
+        return max(components.values(), key=len)
+
+    def solve_positions(self, nodes, edges):
+        # Least-squares placement over every registered pair, weighted by match quality, first image fixed
+        column = {node: k for k, node in enumerate(nodes)}
+        rows = [(column[i], column[j], dx, dy, np.sqrt(w)) for i, j, dx, dy, w in edges if i in column]
+        a = np.zeros((len(rows) + 1, len(nodes)))
+        b = np.zeros((len(rows) + 1, 2))
+        for r, (ci, cj, dx, dy, w) in enumerate(rows):
+            # Position of j relative to i is the shift that maps j onto i
+            a[r, cj] = w
+            a[r, ci] = -w
+            b[r] = (w * dx, w * dy)
+        a[-1, 0] = 1
+        positions, _, _, _ = np.linalg.lstsq(a, b, rcond=None)
+        return positions
+
+    def register(self):
+        total = len(self.image_paths)
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            features = []
+            for i, result in enumerate(executor.map(self.load_features, self.image_paths)):
+                features.append(result)
+                self.report("Detecting features", i + 1, total)
+
+            # Raster scans overlap across rows as well, so pairs beyond i and i+1 are tried too
+            sizes = [size for size, _, _ in features]
+            placement = ProvisionalPlacement(total)
+            batches = self.pair_batches()
+            total_pairs = sum(len(batch) for batch in batches)
+            edges = []
+            done = 0
+            for batch in batches:
+                pairs = [(i, j) for i, j in batch if self.may_overlap(placement, sizes, i, j)]
+                done += len(batch) - len(pairs)
+                for (i, j), match in zip(pairs, executor.map(
+                        lambda p: self.register_pair(features[p[0]], features[p[1]]), pairs)):
+                    if match is not None:
+                        edges.append((i, j, *match))
+                        placement.union(i, j, match[0], match[1])
+                    done += 1
+                    self.report("Registering neighbours", done, total_pairs)
+
+        self.placed = sorted(self.largest_component(placement))
+        if len(self.placed) < 2:
+            raise ValueError("No overlapping captures could be registered")
+        skipped = [os.path.basename(self.image_paths[i]) for i in range(total) if i not in self.placed]
+        if skipped:
+            self.notes.append(f"Skipped {len(skipped)} image(s) that did not overlap the mosaic: {', '.join(skipped)}")
+
+        positions = self.solve_positions(self.placed, edges)
+        positions -= positions.min(axis=0)
+        self.image_sizes = [features[i][0] for i in self.placed]
+        self.offsets = [(int(round(x)), int(round(y))) for x, y in positions]
+        width = max(x + w for (x, _), (w, _) in zip(self.offsets, self.image_sizes))
+        height = max(y + h for (_, y), (_, h) in zip(self.offsets, self.image_sizes))
+        return width, height
+
+    # Blending
+
+    def get_image(self, index):
+        if index in self._image_cache:
+            self._image_cache.move_to_end(index)
+            return self._image_cache[index]
+        image = cv2.imread(self.image_paths[index])
+        if image is None:
+            # Deleted or replaced since registration
+            raise ValueError(f"Failed to read image: {self.image_paths[index]}")
+        if self.scale != 1.0:
+            width, height = self.image_sizes[self.placed.index(index)]
+            image = cv2.resize(image, (width, height), interpolation=cv2.INTER_AREA)
+        # Images stay uint8 in the cache; only the slice a tile needs is widened to float
+        self._image_cache[index] = image
+        if len(self._image_cache) > self.max_cached_images:
+            self._image_cache.popitem(last=False)
+        return image
+
+    def get_weights(self, width, height):
+        key = (width, height)
+        if key not in self._weight_cache:
+            # Feather weights fall off towards the edges so seams blend smoothly
+            x = np.minimum(np.arange(width), np.arange(width)[::-1]) + 1
+            y = np.minimum(np.arange(height), np.arange(height)[::-1]) + 1
+            self._weight_cache[key] = np.minimum.outer(y, x).astype(np.float32)
+        return self._weight_cache[key]
+
+    def render_tile(self, x0, y0, x1, y1):
+        accumulator = np.zeros((y1 - y0, x1 - x0, 3), np.float32)
+        weight_sum = np.zeros((y1 - y0, x1 - x0), np.float32)
+        for index, (ox, oy), (w, h) in zip(self.placed, self.offsets, self.image_sizes):
+            ix0, iy0 = max(x0, ox), max(y0, oy)
+            ix1, iy1 = min(x1, ox + w), min(y1, oy + h)
+            if ix0 >= ix1 or iy0 >= iy1:
+                continue
+            image = self.get_image(index)
+            weights = self.get_weights(w, h)[iy0 - oy:iy1 - oy, ix0 - ox:ix1 - ox]
+            accumulator[iy0 - y0:iy1 - y0, ix0 - x0:ix1 - x0] += \
+                image[iy0 - oy:iy1 - oy, ix0 - ox:ix1 - ox] * weights[..., None]
+            weight_sum[iy0 - y0:iy1 - y0, ix0 - x0:ix1 - x0] += weights
+
+        np.maximum(weight_sum, 1e-6, out=weight_sum)
+        accumulator /= weight_sum[..., None]
+        return np.clip(accumulator, 0, 255).astype(np.uint8)
+
+    def apply_scale(self, scale):
+        self.scale = scale
+        self.offsets = [(int(x * scale), int(y * scale)) for x, y in self.offsets]
+        self.image_sizes = [(max(int(w * scale), 1), max(int(h * scale), 1)) for w, h in self.image_sizes]
+
+    def stitch(self, output_path):
+        if len(self.image_paths) < 2:
+            raise ValueError("At least two images are needed to build a mosaic")
+
+        width, height = self.register()
+        scale = min(1.0, MAX_JPEG_SIDE / max(width, height), math.sqrt(MAX_MOSAIC_PIXELS / (width * height)))
+        if scale < 1.0:
+            self.apply_scale(scale)
+            self.notes.append(f"The full mosaic is {width}x{height} px, beyond the {MAX_JPEG_SIDE} px per side "
+                              f"or {MAX_MOSAIC_PIXELS / 1e6:.0f} MP that can be saved and opened; "
+                              f"it was saved at {self.scale:.0%} scale")
+            width = max(x + w for (x, _), (w, _) in zip(self.offsets, self.image_sizes))
+            height = max(y + h for (_, y), (_, h) in zip(self.offsets, self.image_sizes))
+
+        # The full mosaic only ever lives in a disk-backed buffer in the system temp folder;
+        # RAM holds one tile at a time
+        buffer_file = tempfile.NamedTemporaryFile(prefix='mosaic-', suffix='.raw', delete=False)
+        buffer_file.close()
+        try:
+            mosaic = np.memmap(buffer_file.name, dtype=np.uint8, mode='w+', shape=(height, width, 3))
+            rows = range(0, height, self.tile_size)
+            cols = range(0, width, self.tile_size)
+            total = len(rows) * len(cols)
+            done = 0
+            for y0 in rows:
+                for x0 in cols:
+                    x1, y1 = min(x0 + self.tile_size, width), min(y0 + self.tile_size, height)
+                    mosaic[y0:y1, x0:x1] = self.render_tile(x0, y0, x1, y1)
+                    done += 1
+                    self.report("Blending tiles", done, total)
+            mosaic.flush()
+            self._image_cache.clear()
+
+            self.report("Writing mosaic", 0, 1)
+            if not cv2.imwrite(output_path, mosaic):
+                raise ValueError(f"Failed to write mosaic: {output_path}")
+            del mosaic
+        finally:
+            os.remove(buffer_file.name)
+        self.report("Writing mosaic", 1, 1)
+        return output_path
+
+
+def list_source_images(project_folder):
+    images = []
+    for filename in sorted(os.listdir(project_folder)):
+        stem, ext = os.path.splitext(filename)
+        if ext.lower() in IMAGE_EXTENSIONS and not stem.endswith(MOSAIC_SUFFIX):
+            images.append(os.path.join(project_folder, filename))
+    return images
+
+
+def next_mosaic_path(project_folder, file_count):
+    timestamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+    return os.path.join(project_folder, f"{timestamp}-{file_count+1:05d}{MOSAIC_SUFFIX}.jpg")
+
+
+class MosaicWorker(QThread):
+    progress = pyqtSignal(str, int, int)
+    stitched = pyqtSignal(str, list)
+    failed = pyqtSignal(str)
+
+    def __init__(self, image_paths, output_path, max_pair_distance=DEFAULT_PAIR_DISTANCE, parent=None):
+        super().__init__(parent)
+        self.image_paths = image_paths
+        self.output_path = output_path
+        self.max_pair_distance = max_pair_distance
+
+    def run(self):
+        stitcher = MosaicStitcher(self.image_paths, max_pair_distance=self.max_pair_distance)
+        stitcher.progress_callback = self.progress.emit
+        try:
+            stitcher.stitch(self.output_path)
+        except (ValueError, cv2.error, OSError) as e:
+            self.failed.emit(str(e))
+        else:
+            self.stitched.emit(self.output_path, stitcher.notes)
@@ -5,6 +5,8 @@ from PyQt5.QtWidgets import (QWidget, QStackedWidget, QVBoxLayout, QHBoxLayout,
 from PyQt5.QtCore import Qt, QDateTime, pyqtSignal
 from PyQt5.QtGui import QColor
 from action_page import ActionPage
+from metrics import metrics
+from project_watcher import get_project_watcher
 
 class CreateProjectDialog(QDialog):
     def __init__(self, parent=None):
@@ -43,6 +45,8 @@ class ProjectPage(QWidget):
         self.projects_file = 'projects.json'
         self.projects_folder = 'projects'
         self.setup_storage()
+        self.watcher = get_project_watcher(self.projects_folder)
+        self.watcher.project_changed.connect(self.on_project_changed)
         self.setup_ui()
 
     def setup_storage(self):
@@ -103,15 +107,39 @@ class ProjectPage(QWidget):
         self.update_project_list()
 
     def load_projects(self):
-        with open(self.projects_file, 'r') as f:
+        with metrics.timer('catalogue.load'), open(self.projects_file, 'r') as f:
             return json.load(f)
 
     def save_projects(self, projects):
-        with open(self.projects_file, 'w') as f:
+        with metrics.timer('catalogue.save'), open(self.projects_file, 'w') as f:
             json.dump(projects, f)
 
+    def sync_watched_projects(self, projects):
+        # Counts come from the watcher's index, so files changed while the app was closed are picked up here
+        self.watcher.sync_projects([p['name'] for p in projects])
+        changed = False
+        for project in projects:
+            count = self.watcher.file_count(project['name'])
+            if project['total_data'] != count:
+                project['total_data'] = count
+                changed = True
+        if changed:
+            self.save_projects(projects)
+
+    def on_project_changed(self, project_name, added, removed, modified):
+        projects = self.load_projects()
+        for project in projects:
+            if project['name'] == project_name:
+                count = self.watcher.file_count(project_name)
+                if project['total_data'] != count:
+                    project['total_data'] = count
+                    self.save_projects(projects)
+                    self.update_project_display()
+                break
+
     def update_project_list(self):
         projects = self.load_projects()
+        self.sync_watched_projects(projects)
         self.projects_table.setRowCount(len(projects))
         for row, project in enumerate(projects):
             self.projects_table.setItem(row, 0, QTableWidgetItem(project['name']))
@@ -0,0 +1,187 @@
+import os
+import time
+from PyQt5.QtCore import QObject, QFileSystemWatcher, QTimer, pyqtSignal
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.bmp', '.gif')
+
+
+class ProjectWatcher(QObject):
+    # project name, added, removed, modified filenames
+    project_changed = pyqtSignal(str, list, list, list)
+
+    def __init__(self, projects_folder='projects', debounce_ms=250, max_delay_ms=2000, parent=None):
+        super().__init__(parent)
+        self.projects_folder = projects_folder
+        self.debounce_ms = debounce_ms
+        self.max_delay_ms = max_delay_ms
+        self.index = {}
+        # project -> {filename: (size, mtime_ns)} for files still being written, not yet in the index
+        self.unsettled = {}
+        self.pending = set()
+        self.first_pending = None
+
+        # Only project folders are watched: a watch per image would exhaust inotify watches, kqueue
+        # descriptors and change handles at the tens of thousands of images a project can hold
+        self.watcher = QFileSystemWatcher(self)
+        self.watcher.directoryChanged.connect(self.queue_rescan)
+
+        self.debounce_timer = QTimer(self)
+        self.debounce_timer.setSingleShot(True)
+        self.debounce_timer.timeout.connect(self.process_pending)
+
+        self.settle_timer = QTimer(self)
+        self.settle_timer.setInterval(debounce_ms)
+        self.settle_timer.timeout.connect(self.settle_pending)
+
+    def project_folder(self, project_name):
+        return os.path.join(self.projects_folder, project_name)
+
+    def scan(self, project_name):
+        entries = {}
+        with os.scandir(self.project_folder(project_name)) as it:
+            for entry in it:
+                if entry.is_file():
+                    stat = entry.stat()
+                    entries[entry.name] = (stat.st_size, stat.st_mtime_ns)
+        return entries
+
+    def watch_project(self, project_name):
+        if project_name in self.index:
+            return
+        project_folder = self.project_folder(project_name)
+        if not os.path.isdir(project_folder):
+            return
+        self.index[project_name] = self.scan(project_name)
+        self.unsettled[project_name] = {}
+        self.watcher.addPath(project_folder)
+
+    def unwatch_project(self, project_name):
+        self.index.pop(project_name, None)
+        self.unsettled.pop(project_name, None)
+        self.pending.discard(project_name)
+        project_folder = self.project_folder(project_name)
+        if project_folder in self.watcher.directories():
+            self.watcher.removePath(project_folder)
+
+    def sync_projects(self, project_names):
+        for project_name in set(self.index) - set(project_names):
+            self.unwatch_project(project_name)
+        for project_name in project_names:
+            self.watch_project(project_name)
+
+    def files(self, project_name):
+        self.watch_project(project_name)
+        return sorted(self.index.get(project_name, {}))
+
+    def images(self, project_name):
+        return [f for f in self.files(project_name) if f.lower().endswith(IMAGE_EXTENSIONS)]
+
+    def file_count(self, project_name):
+        self.watch_project(project_name)
+        return len(self.index.get(project_name, {}))
+
+    def note_file(self, project_name, filename):
+        # Files written by the app are recorded and announced straight away instead of waiting for the watcher
+        self.watch_project(project_name)
+        if project_name not in self.index:
+            return
+        stat = os.stat(os.path.join(self.project_folder(project_name), filename))
+        self.unsettled[project_name].pop(filename, None)
+        old = self.index[project_name].get(filename)
+        new = self.index[project_name][filename] = (stat.st_size, stat.st_mtime_ns)
+        if old is None:
+            self.project_changed.emit(project_name, [filename], [], [])
+        elif old != new:
+            self.project_changed.emit(project_name, [], [], [filename])
+
+    def forget_file(self, project_name, filename):
+        self.unsettled.get(project_name, {}).pop(filename, None)
+        if self.index.get(project_name, {}).pop(filename, None) is not None:
+            self.project_changed.emit(project_name, [], [filename], [])
+
+    def queue_rescan(self, path):
+        project_name = os.path.basename(os.path.normpath(path))
+        if project_name not in self.index:
+            return
+        now = time.monotonic()
+        if not self.pending:
+            self.first_pending = now
+        self.pending.add(project_name)
+        # Bursts keep pushing the rescan back, but never beyond max_delay_ms after the first event
+        if (now - self.first_pending) * 1000 >= self.max_delay_ms:
+            self.process_pending()
+        else:
+            self.debounce_timer.start(self.debounce_ms)
+
+    def process_pending(self):
+        self.debounce_timer.stop()
+        pending, self.pending = self.pending, set()
+        for project_name in sorted(pending):
+            if project_name not in self.index:
+                continue
+            old = self.index[project_name]
+            if os.path.isdir(self.project_folder(project_name)):
+                new = self.scan(project_name)
+                # Some platforms drop the watch when a directory is replaced
+                if self.project_folder(project_name) not in self.watcher.directories():
+                    self.watcher.addPath(self.project_folder(project_name))
+            else:
+                new = {}
+
+            # New and changed files wait in unsettled until their size and time stop changing,
+            # so a capture that is still being written is never announced half done
+            unsettled = self.unsettled[project_name]
+            for filename in set(unsettled) - set(new):
+                del unsettled[filename]
+            for filename, stat in new.items():
+                if old.get(filename) != stat and filename not in unsettled:
+                    unsettled[filename] = stat
+            removed = sorted(set(old) - set(new))
+            for filename in removed:
+                del old[filename]
+            if removed:
+                self.project_changed.emit(project_name, [], removed, [])
+        if any(self.unsettled.values()):
+            self.settle_timer.start()
+
+    def settle_pending(self):
+        # Listeners may unwatch projects while this runs, so work from a copy
+        for project_name, unsettled in list(self.unsettled.items()):
+            index = self.index.get(project_name)
+            if index is None:
+                continue
+            added, removed, modified = [], [], []
+            for filename, stat in sorted(unsettled.items()):
+                try:
+                    current = os.stat(os.path.join(self.project_folder(project_name), filename))
+                    current = (current.st_size, current.st_mtime_ns)
+                except OSError:
+                    current = None
+                if current is not None and current != stat:
+                    # Still being written; check again on the next tick
+                    unsettled[filename] = current
+                    continue
+                del unsettled[filename]
+                if current is None:
+                    if index.pop(filename, None) is not None:
+                        removed.append(filename)
+                elif filename not in index:
+                    added.append(filename)
+                elif index[filename] != current:
+                    modified.append(filename)
+                if current is not None:
+                    index[filename] = current
+            if added or removed or modified:
+                self.project_changed.emit(project_name, added, removed, modified)
+        if not any(self.unsettled.values()):
+            self.settle_timer.stop()
+
+
+_project_watcher = None
+
+
+def get_project_watcher(projects_folder='projects'):
+    global _project_watcher
+    if _project_watcher is None:
+        _project_watcher = ProjectWatcher(projects_folder)
+    return _project_watcher
@@ -0,0 +1,275 @@
+import sqlite3
+import time
+from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton, QComboBox, QLineEdit,
+                             QCheckBox, QDateTimeEdit, QTableWidget, QTableWidgetItem, QHeaderView,
+                             QMessageBox, QAbstractItemView)
+from PyQt5.QtCore import QDateTime, QThread, pyqtSignal
+from image_index import ImageIndex
+from image_viewer import ImageViewer
+from project_watcher import get_project_watcher
+
+SORT_OPTIONS = [
+    ("Newest first", 'captured_at', True),
+    ("Oldest first", 'captured_at', False),
+    ("Largest first", 'size', True),
+    ("Smallest first", 'size', False),
+    ("Project", 'project', False),
+    ("Metric (high to low)", 'metric', True),
+    ("Metric (low to high)", 'metric', False),
+]
+
+class IndexRefreshWorker(QThread):
+    progress = pyqtSignal(int, int)
+    refreshed = pyqtSignal(list)
+    failed = pyqtSignal(str)
+
+    def __init__(self, index, rescan, parent=None):
+        super().__init__(parent)
+        self.index_file = index.index_file
+        self.projects_file = index.projects_file
+        self.projects_folder = index.projects_folder
+        self.stored_analysis = index.stored_analysis
+        self.rescan = rescan
+
+    def run(self):
+        # SQLite connections belong to the thread that opened them, so the worker opens its own
+        index = ImageIndex(self.index_file, self.projects_file, self.projects_folder)
+        index.stored_analysis = self.stored_analysis
+        index.progress_callback = self.progress.emit
+        index.should_stop = self.isInterruptionRequested
+        try:
+            projects = index.refresh(rescan=self.rescan)
+        except (OSError, ValueError, sqlite3.Error) as e:
+            self.failed.emit(str(e))
+            return
+        finally:
+            index.close()
+        self.refreshed.emit(projects)
+
+class SearchPage(QWidget):
+    open_in_grid = pyqtSignal(str, list)
+
+    def __init__(self):
+        super().__init__()
+        self.projects_file = 'projects.json'
+        self.projects_folder = 'projects'
+        self.index = ImageIndex(projects_file=self.projects_file, projects_folder=self.projects_folder)
+        self.results = []
+        self.image_viewer = None
+        self.refresh_worker = None
+        self.indexed = False
+        # File changes reach the index as they happen, so visiting the page does not rescan every project
+        self.watcher = get_project_watcher(self.projects_folder)
+        self.watcher.project_changed.connect(self.on_project_changed)
+        self.setup_ui()
+
+    def setup_ui(self):
+        layout = QVBoxLayout()
+
+        # Project and sync filters
+        filter_layout = QHBoxLayout()
+        filter_layout.addWidget(QLabel("Project:"))
+        self.project_dropdown = QComboBox()
+        filter_layout.addWidget(self.project_dropdown)
+        filter_layout.addWidget(QLabel("Sync:"))
+        self.sync_dropdown = QComboBox()
+        filter_layout.addWidget(self.sync_dropdown)
+        layout.addLayout(filter_layout)
+
+        # Capture time range
+        time_layout = QHBoxLayout()
+        self.from_checkbox = QCheckBox("From:")
+        self.from_input = QDateTimeEdit(QDateTime.currentDateTime().addDays(-7))
+        self.from_input.setCalendarPopup(True)
+        self.to_checkbox = QCheckBox("To:")
+        self.to_input = QDateTimeEdit(QDateTime.currentDateTime())
+        self.to_input.setCalendarPopup(True)
+        time_layout.addWidget(self.from_checkbox)
+        time_layout.addWidget(self.from_input)
+        time_layout.addWidget(self.to_checkbox)
+        time_layout.addWidget(self.to_input)
+        layout.addLayout(time_layout)
+
+        # Size and analysis metric ranges
+        range_layout = QHBoxLayout()
+        range_layout.addWidget(QLabel("Size (KB):"))
+        self.min_size_input = QLineEdit()
+        self.min_size_input.setPlaceholderText("min")
+        self.max_size_input = QLineEdit()
+        self.max_size_input.setPlaceholderText("max")
+        range_layout.addWidget(self.min_size_input)
+        range_layout.addWidget(self.max_size_input)
+        range_layout.addWidget(QLabel("Metric:"))
+        self.metric_dropdown = QComboBox()
+        range_layout.addWidget(self.metric_dropdown)
+        self.metric_min_input = QLineEdit()
+        self.metric_min_input.setPlaceholderText("min")
+        self.metric_max_input = QLineEdit()
+        self.metric_max_input.setPlaceholderText("max")
+        range_layout.addWidget(self.metric_min_input)
+        range_layout.addWidget(self.metric_max_input)
+        layout.addLayout(range_layout)
+
+        # Sorting and actions
+        action_layout = QHBoxLayout()
+        action_layout.addWidget(QLabel("Sort:"))
+        self.sort_dropdown = QComboBox()
+        for label, _, _ in SORT_OPTIONS:
+            self.sort_dropdown.addItem(label)
+        action_layout.addWidget(self.sort_dropdown)
+        search_button = QPushButton("Search")
+        search_button.clicked.connect(self.run_search)
+        action_layout.addWidget(search_button)
+        refresh_button = QPushButton("Refresh Index")
+        refresh_button.clicked.connect(lambda: self.refresh_index())
+        action_layout.addWidget(refresh_button)
+        layout.addLayout(action_layout)
+
+        self.status_label = QLabel("")
+        layout.addWidget(self.status_label)
+
+        # Results table
+        self.results_table = QTableWidget()
+        self.results_table.setColumnCount(6)
+        self.results_table.setHorizontalHeaderLabels(["Project", "Filename", "Captured", "Size (KB)", "Sync", "Metric"])
+        self.results_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        self.results_table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.results_table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.results_table.doubleClicked.connect(self.open_in_viewer)
+        layout.addWidget(self.results_table)
+
+        button_layout = QHBoxLayout()
+        viewer_button = QPushButton("Open in Viewer")
+        viewer_button.clicked.connect(self.open_in_viewer)
+        button_layout.addWidget(viewer_button)
+        grid_button = QPushButton("Show in Grid")
+        grid_button.clicked.connect(self.show_in_grid)
+        button_layout.addWidget(grid_button)
+        layout.addLayout(button_layout)
+
+        self.setLayout(layout)
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        # The first visit catches up with changes made while the app was closed; later visits only
+        # pick up catalogue changes and new projects
+        self.refresh_index(rescan=not self.indexed)
+
+    def refresh_index(self, rescan=True):
+        if self.refresh_worker and self.refresh_worker.isRunning():
+            return
+        # Scanning a large catalogue takes seconds, so it runs off the GUI thread; searches keep working
+        # against the previous contents meanwhile
+        self.indexed = True
+        self.refresh_start = time.perf_counter()
+        self.status_label.setText("Refreshing index...")
+        self.refresh_worker = IndexRefreshWorker(self.index, rescan, self)
+        self.refresh_worker.progress.connect(
+            lambda done, total: self.status_label.setText(f"Refreshing index ({done}/{total} projects)..."))
+        self.refresh_worker.refreshed.connect(self.index_refreshed)
+        self.refresh_worker.failed.connect(self.index_refresh_failed)
+        self.refresh_worker.start()
+
+    def index_refreshed(self, projects):
+        self.update_dropdown(self.project_dropdown, "All Projects", [p['name'] for p in projects])
+        self.update_dropdown(self.sync_dropdown, "Any", sorted({p.get('sync_status', '') for p in projects}))
+        self.update_dropdown(self.metric_dropdown, "None", self.index.metric_names())
+        self.status_label.setText(f"Index refreshed in {(time.perf_counter() - self.refresh_start) * 1000:.0f} ms")
+
+    def index_refresh_failed(self, message):
+        self.status_label.setText("Index refresh failed")
+        QMessageBox.warning(self, "Error", f"Failed to refresh the image index: {message}")
+
+    def on_project_changed(self, project_name, added, removed, modified):
+        # Before the first full refresh the whole project is scanned anyway
+        if self.indexed:
+            self.index.update_files(project_name, added + modified, removed)
+
+    def update_dropdown(self, dropdown, any_label, values):
+        current = dropdown.currentText()
+        dropdown.clear()
+        dropdown.addItem(any_label)
+        dropdown.addItems(values)
+        index = dropdown.findText(current)
+        if index >= 0:
+            dropdown.setCurrentIndex(index)
+
+    def parse_number(self, line_edit, scale=1):
+        text = line_edit.text().strip()
+        if not text:
+            return None
+        return float(text) * scale
+
+    def run_search(self):
+        _, order_by, descending = SORT_OPTIONS[self.sort_dropdown.currentIndex()]
+        metric = self.metric_dropdown.currentText() if self.metric_dropdown.currentIndex() > 0 else None
+        if order_by == 'metric' and not metric:
+            QMessageBox.warning(self, "Error", "Select a metric to sort by")
+            return
+        try:
+            min_size = self.parse_number(self.min_size_input, 1024)
+            max_size = self.parse_number(self.max_size_input, 1024)
+            metric_min = self.parse_number(self.metric_min_input)
+            metric_max = self.parse_number(self.metric_max_input)
+        except ValueError:
+            QMessageBox.warning(self, "Error", "Size and metric limits must be numbers")
+            return
+
+        start = time.perf_counter()
+        self.results = self.index.search(
+            project=self.project_dropdown.currentText() if self.project_dropdown.currentIndex() > 0 else None,
+            start=self.from_input.dateTime().toPyDateTime() if self.from_checkbox.isChecked() else None,
+            end=self.to_input.dateTime().toPyDateTime() if self.to_checkbox.isChecked() else None,
+            min_size=min_size, max_size=max_size,
+            sync_status=self.sync_dropdown.currentText() if self.sync_dropdown.currentIndex() > 0 else None,
+            metric=metric, metric_min=metric_min, metric_max=metric_max,
+            order_by=order_by, descending=descending)
+        elapsed = (time.perf_counter() - start) * 1000
+        self.display_results()
+        self.status_label.setText(f"{len(self.results)} results in {elapsed:.1f} ms")
+
+    def display_results(self):
+        self.results_table.setRowCount(len(self.results))
+        for row, result in enumerate(self.results):
+            self.results_table.setItem(row, 0, QTableWidgetItem(result['project']))
+            self.results_table.setItem(row, 1, QTableWidgetItem(result['filename']))
+            self.results_table.setItem(row, 2, QTableWidgetItem(result['captured_at'].strftime("%d-%m-%Y %H:%M:%S")))
+            self.results_table.setItem(row, 3, QTableWidgetItem(f"{result['size'] / 1024:.0f}"))
+            self.results_table.setItem(row, 4, QTableWidgetItem(result['sync_status'] or ''))
+            metric_value = result.get('metric_value')
+            self.results_table.setItem(row, 5, QTableWidgetItem('' if metric_value is None else f"{metric_value:g}"))
+
+    def selected_result(self):
+        row = self.results_table.currentRow()
+        if row < 0 or row >= len(self.results):
+            QMessageBox.warning(self, "No Image Selected", "Please select a result first.")
+            return None
+        return self.results[row]
+
+    def open_in_viewer(self):
+        result = self.selected_result()
+        if result:
+            image_paths = [r['path'] for r in self.results]
+            # Reuse one viewer and step through the results with Previous/Next
+            if self.image_viewer is None:
+                self.image_viewer = ImageViewer(result['path'], image_paths)
+                self.image_viewer.setWindowTitle(result['filename'])
+                self.image_viewer.resize(800, 600)
+            else:
+                self.image_viewer.set_image_list(image_paths, result['path'])
+            self.image_viewer.show()
+            self.image_viewer.raise_()
+
+    def show_in_grid(self):
+        result = self.selected_result()
+        if result:
+            # The grid shows one project, so open the selected result's project filtered to its matches
+            filenames = [r['filename'] for r in self.results if r['project'] == result['project']]
+            self.open_in_grid.emit(result['project'], filenames)
+
+    def close_index(self):
+        # Pages in a QStackedWidget never get a closeEvent, so this runs on aboutToQuit
+        if self.refresh_worker and self.refresh_worker.isRunning():
+            self.refresh_worker.requestInterruption()
+            self.refresh_worker.wait()
+        self.index.close()
@@ -1,4 +1,5 @@
 from PyQt5.QtWidgets import QWidget, QVBoxLayout, QLabel, QPushButton
+from metrics import metrics
 
 class SyncPage(QWidget):
     def __init__(self):
@@ -18,5 +19,7 @@ class SyncPage(QWidget):
     def start_sync(self):
         # Implementasi sinkronisasi
         self.sync_status.setText("Sync Status: Syncing...")
+        metrics.count('sync.started')
+        # Transfer gambar dibungkus dengan metrics.timer('sync.transfer')
         # Setelah sinkronisasi selesai:
         # self.sync_status.setText("Sync Status: Synced")
\ No newline at end of file
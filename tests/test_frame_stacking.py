@@ -0,0 +1,45 @@
+import numpy as np
+import pytest
+
+pytest.importorskip('cv2')
+pytest.importorskip('PyQt5')
+
+from frame_stacking import FrameStacker
+
+
+def stack(method, values, shape=(4, 6, 3)):
+    stacker = FrameStacker(method)
+    for value in values:
+        stacker.add(np.full(shape, value, np.uint8))
+    return stacker.result()
+
+
+def test_sigma_clip_rejects_saturated_frame():
+    result = stack('Sigma-clipped', [100, 100, 255, 100, 100])
+    assert (result == 100).all()
+
+
+def test_sigma_clip_rejects_outlier_among_noisy_frames():
+    result = stack('Sigma-clipped', [98, 100, 101, 102, 255])
+    assert (result == 100).all()
+
+
+def test_sigma_clip_keeps_inliers():
+    result = stack('Sigma-clipped', [98, 100, 101, 102, 99])
+    assert (result == 100).all()
+
+
+def test_mean_keeps_outlier():
+    result = stack('Mean', [100, 100, 255, 100, 100])
+    assert (result == 131).all()
+
+
+def test_median_rejects_saturated_frame():
+    result = stack('Median', [100, 100, 255, 100, 90])
+    assert (result == 100).all()
+
+
+def test_partial_window_is_flushed_and_weighted():
+    # Seven frames with a window of five: medians 30 (x5) and 65 (x2) average to 40
+    result = stack('Median', [10, 20, 30, 40, 50, 60, 70])
+    assert (result == 40).all()